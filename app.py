@@ -1,18 +1,33 @@
 import streamlit as st
-import requests
+import atexit
+import functools
 import json
 import random
 import time
+import os
+import hashlib
+import threading
+import io
+import wave
+import socket
+import sqlite3
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import date
 import datetime
-from openai import OpenAI
 from audio_recorder_streamlit import audio_recorder
 import streamlit.components.v1 as components
-from supabase import create_client, Client
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from curriculum import GEMINI_MODELS, GRAMMAR_SYLLABUS, TTS_MODEL, TTS_VOICE, MissionStreamParser, curriculum_payload, grammar_tts_text, is_valid_mission, normalize_level
+from content_pack import ContentPacks, audio_key, blob_key, mission_key
+from grading import grade_locally, normalize_sentence
 
 # ==========================================
 # 1. 환경 설정 및 초기화
 # ==========================================
+RERUN_T0 = time.perf_counter()
 st.set_page_config(page_title="AI 중학 영어 스파르타", layout="centered")
 
 # CSS
@@ -43,16 +58,44 @@ except Exception as e:
     st.error(f"❌ 설정 오류: Secrets를 확인해주세요. ({str(e)})")
     st.stop()
 
-# 클라이언트 초기화
-client = OpenAI(api_key=openai_api_key)
-supabase: Client = create_client(supabase_url, supabase_key)
+# 선택 설정: 로컬 부하 테스트(bench/)에서 가짜 서버와 임시 캐시 폴더를 가리킬 때 사용
+gemini_base_url = st.secrets.get("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com")
+openai_base_url = st.secrets.get("OPENAI_BASE_URL")
+teacher_code = st.secrets.get("TEACHER_CODE")  # 설정하면 사이드바에 교사 코드 입력란이 생기고, 맞으면 교사용 대시보드를 표시
+
+# 클라이언트는 get_openai_client / get_supabase / get_http_session에서 프로세스당 한 번만 생성
+
+# 프로세스 공용 캐시 (모든 학생 세션이 공유, 재시작 후에도 디스크에 남음)
+CACHE_DIR = st.secrets.get("CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+CONTENT_DIR = st.secrets.get("CONTENT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "content"))  # content_pack.py로 미리 만든 팩
+AUDIO_MEM_BUDGET = 64 * 1024 * 1024  # 메모리 LRU 최대 64MB, 초과분은 디스크에서만 제공
+CURRICULUM_MEM_BUDGET = 8 * 1024 * 1024
+GRADING_MEM_BUDGET = 4 * 1024 * 1024
+GRADER_MODEL = "gpt-4o-mini"
+REVIEW_LIMIT = 10  # 퀴즈에 섞는 복습 단어 최대 개수 (sql/003_review_schedule.sql)
+TEACHER_CACHE_TTL = 300  # 교사용 통계 캐시(초): 집계는 트리거로 계속 갱신되므로 몇 분 늦어도 충분
+TEACHER_PAGE_SIZE = 20
+TRANSCRIPT_MEM_BUDGET = 2 * 1024 * 1024
+WHISPER_MODEL = "whisper-1"
+SPEECH_RATE = 16000  # Whisper 내부 샘플레이트와 같게 맞춰서 업로드 크기를 줄임
+# 커리큘럼 버전, 문법 순서, 요일 주제, TTS 모델은 curriculum.py에 (콘텐츠 팩 빌더와 공유)
+
+GEMINI_HEDGE_DELAY = 4.0  # 앞 모델이 이 시간(초) 안에 응답하지 않으면 다음 후보를 동시에 시작
+GEMINI_ATTEMPT_TIMEOUT = (5, 60)  # 시도 1회의 (연결, 응답 대기) 제한(초)
+GEMINI_ATTEMPT_DEADLINE = 60  # 시도 1회의 전체 제한(초): 조각이 조금씩 계속 와서 응답 대기 제한이 안 걸려도 끊음
+GEMINI_TOTAL_DEADLINE = 120  # 미션 생성 전체 제한(초)
+GEMINI_MAX_RETRIES = 2  # 429/5xx 응답 시 모델별 재시도 횟수
+GEMINI_STREAMING = True  # 문법/단어가 완성되는 즉시 화면을 열고 예문은 이어서 채움
 
 # 세션 상태 초기화
 if "user_info" not in st.session_state: st.session_state.user_info = None 
 if "mission" not in st.session_state: st.session_state.mission = None
-if "audio_cache" not in st.session_state: st.session_state.audio_cache = {}
 if "practice_results" not in st.session_state: st.session_state.practice_results = {}
 if "last_processed_audio" not in st.session_state: st.session_state.last_processed_audio = {} 
+if "quiz_results" not in st.session_state: st.session_state.quiz_results = {}
+if "jobs" not in st.session_state: st.session_state.jobs = {}
+if "perf_session" not in st.session_state: st.session_state.perf_session = uuid.uuid4().hex[:8]
+if "rerun_ms" not in st.session_state: st.session_state.rerun_ms = []
 if "quiz_state" not in st.session_state:
     st.session_state.quiz_state = {
         "phase": "ready", "current_idx": 0, "shuffled_words": [], 
@@ -62,157 +105,655 @@ if "quiz_state" not in st.session_state:
 # ==========================================
 # 2. DB 및 유틸리티 함수
 # ==========================================
-def fetch_user_from_db(user_id):
-    response = supabase.table("users").select("*").eq("user_id", user_id).execute()
-    if response.data: return response.data[0]
-    return None
-
-def create_new_user(user_id):
-    data = { "user_id": user_id, "current_level": None, "total_complete_count": 0, "last_test_count": 0, "streak": 0, "last_visit_date": None }
-    supabase.table("users").insert(data).execute()
-
+# 사용자 저장소: 쓰기 결과로 받은 행을 st.session_state.user_info에 바로 반영 (write-through)
 def login_and_update_attendance(user_id):
     if st.session_state.user_info and st.session_state.user_info['user_id'] == user_id:
         return st.session_state.user_info['streak']
 
-    user = fetch_user_from_db(user_id)
-    if not user:
-        create_new_user(user_id)
-        user = fetch_user_from_db(user_id)
-    
-    today_str = date.today().isoformat()
-    last_visit = user.get("last_visit_date")
-    streak = user.get("streak", 0)
-    
-    if last_visit != today_str:
-        if last_visit:
-            delta = (date.today() - datetime.date.fromisoformat(last_visit)).days
-            streak = streak + 1 if delta == 1 else 1
-        else: 
-            streak = 1
-        
-        supabase.table("users").update({ "last_visit_date": today_str, "streak": streak }).eq("user_id", user_id).execute()
-        user = fetch_user_from_db(user_id)
-
+    # 가입 + 출석/연속 학습 갱신을 RPC 1회로 처리 (sql/002_user_repository.sql)
+    res = db_execute("rpc.login_and_touch_attendance", get_supabase().rpc("login_and_touch_attendance", {"p_user_id": user_id, "p_today": date.today().isoformat()}))
+    user = res.data[0]
     st.session_state.user_info = user
-    return streak
+    return user.get("streak", 0)
 
 def complete_daily_mission(user_id):
-    user = fetch_user_from_db(user_id)
-    new_cnt = user.get("total_complete_count", 0) + 1
-    supabase.table("users").update({"total_complete_count": new_cnt}).eq("user_id", user_id).execute()
-    supabase.table("study_logs").insert({ "user_id": user_id, "study_date": date.today().isoformat(), "completed_at": datetime.datetime.now().isoformat() }).execute()
+    # study_logs 추가 + total_complete_count 증가를 서버에서 한 번에 처리하고 새 값을 받음
+    res = db_execute("rpc.complete_daily_mission", get_supabase().rpc("complete_daily_mission", {"p_user_id": user_id, "p_study_date": date.today().isoformat()}))
     
     if st.session_state.user_info:
-        st.session_state.user_info['total_complete_count'] = new_cnt
+        st.session_state.user_info['total_complete_count'] = res.data
 
-def save_wrong_word_db(user_id, word_obj):
-    res = supabase.table("wrong_words").select("*").eq("user_id", user_id).eq("word", word_obj['en']).execute()
-    if res.data:
-        supabase.table("wrong_words").update({"wrong_count": res.data[0]['wrong_count'] + 1}).eq("id", res.data[0]['id']).execute()
-    else:
-        supabase.table("wrong_words").insert({ "user_id": user_id, "word": word_obj['en'], "meaning": word_obj['ko'], "wrong_count": 1 }).execute()
+def fetch_due_reviews(user_id):
+    # 오늘 복습할 오답 단어: (user_id, due_at) 인덱스 범위 조회 1회, 오래 밀린 것부터
+    try:
+        res = db_execute("wrong_words.due", get_supabase().table("wrong_words").select("word, meaning, box")
+                         .eq("user_id", user_id).lte("due_at", datetime.datetime.now(datetime.timezone.utc).isoformat())
+                         .order("due_at").limit(REVIEW_LIMIT))
+        return [{"en": r["word"], "ko": r["meaning"], "review": True} for r in res.data]
+    except Exception: return []  # 복습을 못 불러와도 오늘 단어로만 퀴즈 진행
+
+def record_quiz_answer(word_obj, correct):
+    # 나온 단어를 세션 버퍼에 단어별로 모아두고, 단계(객관식/주관식)가 끝날 때마다 flush_quiz_results로 한 번에 기록
+    # 같은 회차에 여러 번 기록돼도 안전: 틀린 단어는 내일로 미뤄지므로 뒤에 맞힌 기록이 상자를 또 올리지 않음
+    buf = st.session_state.quiz_results
+    item = buf.setdefault(word_obj['en'], {"word": word_obj['en'], "meaning": word_obj['ko'], "misses": 0, "grammar_idx": word_obj.get("grammar_idx")})
+    if not correct: item["misses"] += 1
+
+def flush_quiz_results(user_id):
+    # 오답 누적 + 복습 상자/다음 복습일 갱신을 RPC 1회로 처리 (sql/003_review_schedule.sql, 004에서 문법 단원 추가)
+    buf = st.session_state.quiz_results
+    if not buf: return
+    try:
+        db_execute("rpc.record_quiz_results", get_supabase().rpc("record_quiz_results", {
+            "p_user_id": user_id, "p_items": list(buf.values()), "p_now": datetime.datetime.now(datetime.timezone.utc).isoformat()}))
+        buf.clear()
+    except Exception: pass  # 실패하면 버퍼를 남겨둠 → 다음 단계 끝이나 학습 종료에서 다시 시도하고, 그래도 남아 있으면 종료하지 않음
 
 def update_level_and_test_log(user_id, new_level):
+    new_level = normalize_level(new_level)  # 미션 캐시/콘텐츠 팩 키가 LEVELS 값 기준이므로 저장 전에 맞춤
     cnt = st.session_state.user_info.get("total_complete_count", 0)
-    supabase.table("users").update({ "current_level": new_level, "last_test_count": cnt }).eq("user_id", user_id).execute()
-    st.session_state.user_info['current_level'] = new_level
-    st.session_state.user_info['last_test_count'] = cnt
+    res = db_execute("users.update", get_supabase().table("users").update({ "current_level": new_level, "last_test_count": cnt }).eq("user_id", user_id))
+    if res.data: st.session_state.user_info.update(res.data[0])
+    else:
+        st.session_state.user_info['current_level'] = new_level
+        st.session_state.user_info['last_test_count'] = cnt
+
+# 교사용 통계: 서버에서 집계한 요약 행만 받고, TTL 동안 모든 교사 세션이 공유 (sql/004_teacher_analytics.sql)
+@st.cache_data(ttl=TEACHER_CACHE_TTL, show_spinner=False)
+def teacher_daily_completion(today, days):
+    return db_execute("rpc.teacher_daily_completion", get_supabase().rpc("teacher_daily_completion", {"p_today": today, "p_days": days})).data
+
+@st.cache_data(ttl=TEACHER_CACHE_TTL, show_spinner=False)
+def teacher_streak_distribution(today):
+    return db_execute("rpc.teacher_streak_distribution", get_supabase().rpc("teacher_streak_distribution", {"p_today": today})).data
+
+@st.cache_data(ttl=TEACHER_CACHE_TTL, show_spinner=False)
+def teacher_missed_words(grammar_idx, after_misses, after_word, limit):
+    return db_execute("rpc.teacher_missed_words", get_supabase().rpc("teacher_missed_words", {
+        "p_grammar_idx": grammar_idx, "p_after_misses": after_misses, "p_after_word": after_word, "p_limit": limit})).data
+
+@st.cache_data(ttl=TEACHER_CACHE_TTL, show_spinner=False)
+def teacher_students(today, after_user_id, limit):
+    return db_execute("rpc.teacher_students", get_supabase().rpc("teacher_students", {
+        "p_today": today, "p_after_user_id": after_user_id, "p_limit": limit})).data
+
+class BlobStore:
+    # 내용 해시로 찾는 공용 저장소: 메모리 LRU(바이트 예산) + 디스크 보관 (TTS 음성, 커리큘럼 JSON)
+    def __init__(self, root, max_bytes, suffix):
+        self.root = root; self.max_bytes = max_bytes; self.suffix = suffix; self.name = os.path.basename(root)
+        self.mem = OrderedDict(); self.size = 0
+        self.inflight = {}; self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def key(*parts):
+        return blob_key(*parts)
+
+    def _path(self, k): return os.path.join(self.root, k[:2], f"{k}{self.suffix}")
+
+    def _remember(self, k, data):
+        with self.lock:
+            if k in self.mem: self.size -= len(self.mem.pop(k))
+            if len(data) > self.max_bytes: return
+            self.mem[k] = data; self.size += len(data)
+            while self.size > self.max_bytes:
+                _, old = self.mem.popitem(last=False); self.size -= len(old)
+
+    def get(self, k):
+        with self.lock:
+            if k in self.mem:
+                self.mem.move_to_end(k); return self.mem[k]
+        try:
+            with open(self._path(k), "rb") as f: data = f.read()
+        except OSError: return None
+        self._remember(k, data)
+        return data
+
+    def put(self, k, data):
+        path = self._path(k)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f: f.write(data)
+            os.replace(tmp, path)
+        except OSError: pass
+        self._remember(k, data)
+
+    def get_or_load(self, k, loader):
+        # 같은 키를 동시에 요청하면 한 번만 생성하고 나머지는 그 결과를 기다림
+        data = self.get(k)
+        if data is not None:
+            record_event("cache", self.name, cache="hit"); return data
+        with self.lock:
+            fut = self.inflight.get(k); owner = fut is None
+            if owner: fut = self.inflight[k] = Future()
+        if not owner:
+            record_event("cache", self.name, cache="shared"); return fut.result()
+        try:
+            data = loader()
+            self.put(k, data); fut.set_result(data)
+            record_event("cache", self.name, cache="miss")
+            return data
+        except Exception as e:
+            fut.set_exception(e); raise
+        finally:
+            with self.lock: self.inflight.pop(k, None)
+
+class PerfStore:
+    # 외부 호출/재실행 기록을 SQLite에 저장 (버퍼에 모았다가 2초 또는 50건마다 한 번에 기록)
+    COLUMNS = ("ts", "session", "kind", "name", "ms", "bytes_in", "bytes_out", "tokens", "cache", "model", "ok")
+
+    def __init__(self, path, retention_days=7):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(f"CREATE TABLE IF NOT EXISTS calls ({', '.join(self.COLUMNS)}, extra TEXT)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS calls_ts_idx ON calls (ts)")
+        self.db.execute("DELETE FROM calls WHERE ts < ?", (time.time() - retention_days * 86400,))
+        self.db.commit()
+        self.pending = []; self.last_flush = time.monotonic(); self.lock = threading.Lock()
+
+    def record(self, rec):
+        with self.lock:
+            self.pending.append(rec)
+            if len(self.pending) >= 50 or time.monotonic() - self.last_flush > 2: self._flush()
+
+    def flush(self):
+        with self.lock:
+            if self.pending: self._flush()
+
+    def _flush(self):
+        rows = [tuple(r.get(c) for c in self.COLUMNS) + (json.dumps({k: v for k, v in r.items() if k not in self.COLUMNS}, default=str),) for r in self.pending]
+        self.db.executemany(f"INSERT INTO calls VALUES ({', '.join('?' * (len(self.COLUMNS) + 1))})", rows)
+        self.db.commit()
+        self.pending = []; self.last_flush = time.monotonic()
+
+    def summary(self, since):
+        # 호출 종류별 p50/p95(ms), 오류율, 토큰 합계, 캐시 적중률
+        with self.lock:
+            self._flush()
+            rows = self.db.execute("SELECT kind, name, ms, tokens, cache, ok FROM calls WHERE ts >= ?", (since,)).fetchall()
+        groups = {}
+        for kind, name, ms, tokens, cache, ok in rows: groups.setdefault((kind, name or ""), []).append((ms or 0, tokens or 0, cache, ok))
+        out = []
+        for (kind, name), items in sorted(groups.items()):
+            ms = [i[0] for i in items]; caches = [i[2] for i in items if i[2]]
+            out.append({"종류": kind, "이름": name, "호출": len(items), "p50": round(percentile(ms, 50), 1), "p95": round(percentile(ms, 95), 1),
+                        "오류%": round(100 * sum(1 for i in items if not i[3]) / len(items), 1), "토큰": sum(i[1] for i in items),
+                        "적중%": round(100 * sum(1 for c in caches if c != "miss") / len(caches), 1) if caches else None})
+        return out
+
+def percentile(values, p):
+    if not values: return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+@st.cache_resource
+def get_perf_store():
+    store = PerfStore(os.path.join(CACHE_DIR, "perf.sqlite"))
+    atexit.register(store.flush)  # 버퍼에 남은 기록은 다음 기록이 와야 써지므로 종료할 때 마저 씀
+    return store
+
+@contextmanager
+def trace_call(kind, name="", **fields):
+    # 외부 호출 1회를 감싸 소요 시간과 호출부가 채운 값(bytes/tokens/model 등)을 기록
+    rec = {"ts": time.time(), "kind": kind, "name": name, "ok": 1, **fields}
+    t0 = time.perf_counter()
+    try: yield rec
+    except Exception:
+        rec["ok"] = 0; raise
+    finally:
+        rec["ms"] = (time.perf_counter() - t0) * 1000
+        try: get_perf_store().record(rec)
+        except Exception: pass
+
+def record_event(kind, name="", **fields):
+    try: get_perf_store().record({"ts": time.time(), "kind": kind, "name": name, "ok": 1, "ms": 0, **fields})
+    except Exception: pass
+
+def db_execute(name, query):
+    # Supabase 호출 기록용 래퍼
+    with trace_call("supabase", name) as rec:
+        res = query.execute()
+        rec["bytes_out"] = len(json.dumps(res.data, ensure_ascii=False, default=str))
+        return res
+
+@st.cache_resource
+def get_content_packs():
+    # 미리 만든 미션/음성 팩 (mmap, 읽기 전용). 팩에 없는 것만 실시간 생성
+    return ContentPacks(CONTENT_DIR)
+
+@st.cache_resource
+def get_audio_store():
+    return BlobStore(os.path.join(CACHE_DIR, "audio"), AUDIO_MEM_BUDGET, ".mp3")
+
+@st.cache_resource
+def get_curriculum_store():
+    return BlobStore(os.path.join(CACHE_DIR, "curriculum"), CURRICULUM_MEM_BUDGET, ".json")
+
+@st.cache_resource
+def get_grading_store():
+    return BlobStore(os.path.join(CACHE_DIR, "grading"), GRADING_MEM_BUDGET, ".txt")
+
+@st.cache_resource
+def get_transcript_store():
+    return BlobStore(os.path.join(CACHE_DIR, "transcripts"), TRANSCRIPT_MEM_BUDGET, ".txt")
+
+@st.cache_resource
+def get_live_missions():
+    # 스트리밍 생성 중인 미션: 같은 키를 요청한 학생들이 같은 dict를 함께 봄
+    return {}, threading.Lock()
+
+@st.cache_resource
+def get_worker_pool():
+    return ThreadPoolExecutor(max_workers=16, thread_name_prefix="sparta")
+
+@st.cache_resource
+def get_gemini_pool():
+    # Gemini 시도 전용 풀: 공용 풀 작업(스트리밍 미션 생성 등)이 자기 시도를 기다리다 서로 막히지 않도록 분리
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="gemini")
+
+# 외부 서비스 클라이언트: 무거운 라이브러리는 처음 쓸 때 import하고, 연결 풀은 모든 세션이 공유
+@st.cache_resource
+def get_http_session():
+    # Gemini 호출용 공용 세션: TLS 연결을 재사용
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+    session.headers.update({'Content-Type': 'application/json'})
+    return session
+
+@st.cache_resource
+def get_openai_client():
+    import httpx
+    from openai import OpenAI, DefaultHttpxClient
+    http_client = DefaultHttpxClient(limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60))
+    return OpenAI(api_key=openai_api_key, base_url=openai_base_url, http_client=http_client, timeout=httpx.Timeout(60.0, connect=5.0))
+
+@st.cache_resource
+def get_supabase():
+    from supabase import create_client, ClientOptions
+    return create_client(supabase_url, supabase_key, options=ClientOptions(postgrest_client_timeout=10))
+
+def _synthesize_speech(text):
+    with trace_call("openai.tts", TTS_MODEL, model=TTS_MODEL, bytes_in=len(text.encode("utf-8"))) as rec:
+        content = get_openai_client().audio.speech.create(model=TTS_MODEL, voice=TTS_VOICE, input=text).content
+        rec["bytes_out"] = len(content)
+        return content
+
+def packed_audio(text):
+    # 팩에 있으면 mmap 위의 memoryview를 그대로 반환 (복사 없음)
+    data = get_content_packs().get(audio_key(text))
+    if data is not None: record_event("cache", "pack", cache="hit")
+    return data
 
 def get_audio_bytes(text):
-    if text in st.session_state.audio_cache: return st.session_state.audio_cache[text]
-    try:
-        response = client.audio.speech.create(model="tts-1", voice="alloy", input=text)
-        st.session_state.audio_cache[text] = response.content
-        return response.content
+    data = packed_audio(text)
+    if data is not None: return data
+    try: return get_audio_store().get_or_load(audio_key(text), lambda: _synthesize_speech(text))
     except: return None
 
+def prefetch_audio(texts):
+    # 미션 로딩 시 단어/문법 음성을 한 번에 병렬 생성 (결과는 기다리지 않음)
+    # 다른 세션이 이미 만들고 있는 음성은 건너뜀 (기다리는 작업이 워커를 붙잡지 않도록)
+    store = get_audio_store(); packs = get_content_packs(); pool = get_worker_pool()
+    for text in dict.fromkeys(texts):
+        k = audio_key(text)
+        if k not in store.inflight and packs.get(k) is None and store.get(k) is None:
+            pool.submit(get_audio_bytes, text)
+
+# 백그라운드 작업: OpenAI 호출은 공용 워커 풀에서 돌리고, 결과는 다음 실행(rerun)에서 꺼내 씀
+def submit_job(key, fn, *args):
+    # 같은 키로 다시 제출하면 이전 작업 결과는 버림
+    st.session_state.jobs[key] = get_worker_pool().submit(fn, *args)
+
+def is_job_pending(key):
+    return key in st.session_state.jobs
+
+def pop_job(key):
+    # 끝난 작업이면 (True, 결과)를 돌려주고 목록에서 지움 (예외로 끝났으면 결과는 None)
+    fut = st.session_state.jobs.get(key)
+    if fut is None or not fut.done(): return False, None
+    del st.session_state.jobs[key]
+    return True, (None if fut.exception() else fut.result())
+
+@st.fragment(run_every=1.0)
+def watch_background(keys=(), mission=None, seen=None):
+    # 1초마다 확인해서 지정한 작업이 끝났거나 스트리밍으로 새 예문이 오면 전체 화면을 다시 그림
+    # (조각 안에서 제출한 작업도 감시할 수 있도록 작업을 만든 자리마다 따로 둠)
+    jobs = st.session_state.jobs
+    stream_changed = mission is not None and (not mission.get("_streaming") or len(mission["practice_sentences"]) != seen)
+    if stream_changed or any(k in jobs and jobs[k].done() for k in keys): st.rerun()
+
+def rerun_fragment():
+    # 조각 재실행 중이면 그 조각만, 전체 실행 중이면 앱 전체를 다시 실행
+    try: st.rerun(scope="fragment")
+    except st.errors.StreamlitAPIException: st.rerun()
+
+def record_rerun(name="app", t0=None):
+    # 끝까지 실행된 재실행 시간을 세션 목록(최근 50회)과 저장소에 기록 (조각 재실행은 조각 이름으로)
+    ms = (time.perf_counter() - (RERUN_T0 if t0 is None else t0)) * 1000
+    st.session_state.rerun_ms = (st.session_state.rerun_ms + [ms])[-50:]
+    record_event("rerun", name, ms=ms, session=st.session_state.perf_session)
+
+def timed_fragment(fn):
+    # st.fragment + 조각만 다시 실행될 때의 시간 기록 (전체 실행 안에서 돌 때는 record_rerun이 앱 전체로 기록)
+    # 1초마다 도는 watch_background는 상호작용이 아니라서 쓰지 않음
+    @functools.wraps(fn)
+    def body(*args, **kwargs):
+        t0 = time.perf_counter()
+        try: return fn(*args, **kwargs)
+        finally:
+            ctx = get_script_run_ctx()
+            if ctx is not None and ctx.fragment_ids_this_run: record_rerun(fn.__name__, t0)
+    return st.fragment(body)
+
+def play_tts(label, text, key, autoplay=True):
+    # 이미 만들어진 음성은 바로 재생, 없으면 백그라운드로 생성해서 끝나는 실행에서 재생
+    if st.button(label, key=key):
+        audio = packed_audio(text)
+        if audio is None: audio = get_audio_store().get(audio_key(text))
+        if audio: st.audio(bytes(audio), format='audio/mp3', autoplay=autoplay)
+        else: submit_job(key, get_audio_bytes, text)
+    done, audio = pop_job(key)
+    if done and audio: st.audio(bytes(audio), format='audio/mp3', autoplay=autoplay)
+    elif is_job_pending(key): st.caption("⏳ 생성 중..."); watch_background([key])
+
+def practice_verdict(res, user_val):
+    if "PASS" in res: return {'status': 'PASS', 'input': user_val}
+    return {'status': 'FAIL', 'input': user_val, 'feedback': res.replace("FAIL", "").strip()}
+
 def set_focus_js():
     components.html("""<script>setTimeout(function() { var inputs = window.parent.document.querySelectorAll("input[type=text]"); if (inputs.length > 0) { inputs[inputs.length - 1].focus(); } }, 100);</script>""", height=0)
 
 def run_level_test_ai(text):
-    res = client.chat.completions.create(model="gpt-4o-mini", messages=[{"role":"system", "content":"Evaluate English level (Low/Mid/High) based on user input."}, {"role":"user", "content":text}])
+    with trace_call("openai.chat", "level_test", model="gpt-4o-mini") as rec:
+        res = get_openai_client().chat.completions.create(model="gpt-4o-mini", messages=[{"role":"system", "content":"Evaluate English level (Low/Mid/High) based on user input."}, {"role":"user", "content":text}])
+        rec["tokens"] = getattr(res.usage, "total_tokens", None)
     return res.choices[0].message.content.strip()
 
-@st.cache_data(show_spinner=False, ttl=3600)
-def generate_curriculum(level, _today_str, user_progress_count):
-    model_candidates = ["gemini-flash-latest", "gemini-pro-latest", "gemini-2.0-flash-exp"]
-    headers = {'Content-Type': 'application/json'}
-    
-    grammar_syllabus = [
-        "Be동사의 현재형 (am, are, is)", "일반동사의 현재형 (3인칭 단수 s/es)", "명사와 관사 (a/an, the, 복수형 s)",
-        "대명사 (주격, 소유격, 목적격)", "형용사와 부사의 역할", "Be동사의 부정문과 의문문",
-        "일반동사의 부정문과 의문문 (do/does)", "진행형 시제 (be + v-ing)", "미래 시제 (will, be going to)",
-        "조동사 1 (can, may)", "조동사 2 (must, should, have to)", "의문사 의문문 (Who, What, Where...)",
-        "과거 시제 (Be동사 was/were)", "과거 시제 (일반동사 규칙 -ed)", "과거 시제 (일반동사 불규칙)",
-        "To 부정사의 명사적 용법", "동명사 (v-ing)", "명령문과 제안문 (Let's)", "전치사 (시간: at, on, in)", "전치사 (장소: at, on, in)"
-    ]
-    
-    today_grammar = grammar_syllabus[user_progress_count % len(grammar_syllabus)]
-    
-    topics_by_day = ["School Life", "Hobbies", "Nature & Animals", "Food & Cooking", "Travel", "Health & Feelings", "My Dream Job"]
-    today_topic_hint = topics_by_day[datetime.datetime.now().weekday()]
+def level_test_job(audio_bytes):
+    txt = transcribe_audio(audio_bytes)
+    return txt, (run_level_test_ai(txt) if len(txt) > 1 else None)
 
-    prompt_text = f"""
-    You are an expert English Curriculum Designer for Korean Middle School Grade 1.
-    
-    **CRITICAL INSTRUCTION - SENTENCE GENERATION:**
-    1. **NO DECORATIVE ADJECTIVES:** Do NOT add words like 'big', 'fast', 'happy', 'new' unless absolutely necessary for the grammar rule.
-       - ❌ Bad: "Dad drives a big truck." (Where did 'big' come from?)
-       - ✅ Good: "Dad drives a truck."
-    2. **1:1 Match:** The Korean translation MUST match the English sentence exactly word-for-word.
-    3. **Target Grammar:** Use **"{today_grammar}"**.
-    4. **Simplicity:** Keep sentences under 8 words.
-    
-    **CONTENT GUIDELINES:**
-    1. **Target:** CEFR A2-B1 (Middle School).
-    2. **Mix:** 30% Easy, 50% Medium (Core), 20% Challenge.
-    3. **Topic:** {today_topic_hint}.
-
-    Output JSON Schema:
-    {{
-        "topic": "Topic Name ({today_topic_hint})",
-        "grammar": {{ "title": "{today_grammar}", "description": "Easy Korean Explanation", "rule": "English Rule", "example": "English Example" }},
-        "words": [{{ "en": "...", "ko": "..." }}],
-        "practice_sentences": [
-            {{ 
-                "ko": "Korean Translation", 
-                "en": "English Sentence (No hidden adjectives)", 
-                "hint_structure": "Subject + Verb + Object", 
-                "hint_grammar": "Korean Tip" 
-            }}
-        ]
-    }}
-    Create exactly 20 words and 20 sentences.
-    """
-    
-    payload = { "contents": [{"parts": [{"text": prompt_text}]}], "generationConfig": {"response_mime_type": "application/json"} }
-    
-    last_error_details = []
-    for model_name in model_candidates:
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent?key={google_api_key}"
+def curriculum_inputs(user_progress_count):
+    # 프롬프트를 결정하는 실제 입력: (문법 순서, 요일 주제)
+    return user_progress_count % len(GRAMMAR_SYLLABUS), datetime.datetime.now().weekday()
+
+def generate_curriculum(level, user_progress_count, stream=False):
+    # 같은 (레벨, 문법, 요일) 미션은 모든 학생이 공유하고, 동시 요청은 생성 1회로 합쳐짐
+    # stream=True면 캐시에 없을 때 백그라운드 스트리밍을 시작하고 채워지는 중인 dict를 바로 반환
+    grammar_idx, weekday = curriculum_inputs(user_progress_count)
+    store = get_curriculum_store()
+    k = mission_key(level, grammar_idx, weekday)
+    packed = get_content_packs().get(k)
+    if packed is not None:
+        record_event("cache", "pack", cache="hit"); return json.loads(str(packed, "utf-8"))
+    if stream:
+        data = store.get(k)
+        if data is not None: return json.loads(data)
+        live, lock = get_live_missions()
+        with lock:
+            mission = live.get(k)
+            if mission is None:
+                mission = live[k] = {"practice_sentences": [], "_streaming": True}
+                get_worker_pool().submit(_run_curriculum_stream, k, grammar_idx, weekday, mission)
+        return mission
+    try: return json.loads(store.get_or_load(k, lambda: _request_curriculum(grammar_idx, weekday)))
+    except Exception as e: return {"error": str(e)}
+
+def wait_for_first_content(mission, timeout=GEMINI_TOTAL_DEADLINE):
+    deadline = time.monotonic() + timeout
+    while mission.get("_streaming") and not ("grammar" in mission and "words" in mission) and time.monotonic() < deadline:
+        time.sleep(0.2)
+    return "grammar" in mission and "words" in mission
+
+def _request_curriculum(grammar_idx, weekday):
+    payload = curriculum_payload(grammar_idx, weekday)
+    _, mission = gemini_generate_hedged(payload)
+    return json.dumps(mission, ensure_ascii=False).encode("utf-8")
+
+def _run_curriculum_stream(k, grammar_idx, weekday, mission):
+    # 이미 화면에 나간 필드는 절대 바꾸지 않음: 스트리밍이 실패하면 빠진 필드와 남은 예문만 헤지 요청 결과로 채움
+    # (문법/단어가 오기 전에 실패했으면 채울 것이 전부라서 결과적으로 헤지 요청 전체를 사용)
+    def published():
+        return {f: v for f, v in mission.items() if not f.startswith("_")}
+    def load():
+        payload = curriculum_payload(grammar_idx, weekday); deadline = time.monotonic() + GEMINI_TOTAL_DEADLINE
+        try: _hedged_stream(payload, mission, deadline)
+        except Exception: pass
+        if not is_valid_mission(published()):
+            _fill_missing(mission, gemini_generate_hedged(payload, deadline)[1])
+            if not is_valid_mission(published()): raise RuntimeError("미션을 완성하지 못했습니다")
+        return json.dumps(published(), ensure_ascii=False).encode("utf-8")
+    try: _fill_missing(mission, json.loads(get_curriculum_store().get_or_load(k, load)))
+    except Exception as e: mission["error"] = str(e)
+    finally:
+        mission["_streaming"] = False
+        live, lock = get_live_missions()
+        with lock: live.pop(k, None)
+
+def _fill_missing(mission, source):
+    # 없는 필드만 추가하고 예문은 뒤에 이어 붙임 (학생들이 공유하는 dict라서 기존 값은 그대로 둠)
+    for f, v in source.items():
+        if f == "practice_sentences": mission[f].extend(v[len(mission[f]):])
+        elif f not in mission: mission[f] = v
+
+def _hedged_stream(payload, mission, deadline):
+    # 후보 모델마다 따로 받는 스트림: 앞 스트림이 GEMINI_HEDGE_DELAY 안에 문법/단어를 못 보내거나 실패하면 다음 후보를 추가
+    # 문법/단어가 가장 먼저 완성된 스트림만 공유 mission으로 옮기고 나머지는 끊음
+    pool = get_gemini_pool(); candidates = list(GEMINI_MODELS); streams = []  # (future, 임시 dict, LiveAttempts)
+    winner = None; next_launch = 0.0
+    with trace_call("gemini", "hedged_stream", launched=0) as rec:
+        try:
+            while time.monotonic() < deadline:
+                if winner is None:
+                    if candidates and (time.monotonic() >= next_launch or all(s[0].done() for s in streams)):
+                        model_name = candidates.pop(0); scratch = {"practice_sentences": []}; live = LiveAttempts()
+                        streams.append((pool.submit(_stream_curriculum, model_name, payload, scratch, live, deadline), scratch, live))
+                        next_launch = time.monotonic() + GEMINI_HEDGE_DELAY; rec["launched"] += 1
+                    winner = next((s for s in streams if "grammar" in s[1] and "words" in s[1]), None)
+                    if winner is not None:
+                        rec["model"] = GEMINI_MODELS[streams.index(winner)]; rec["fallback"] = winner is not streams[0]
+                        for s in streams:
+                            if s is not winner: s[2].abort()
+                    elif not candidates and all(s[0].done() for s in streams): raise RuntimeError("모든 스트림 실패")
+                if winner is not None:
+                    done = winner[0].done()  # 옮기기 전에 확인해야 마지막 예문까지 옮김
+                    _fill_missing(mission, winner[1])
+                    if done: winner[0].result(); return
+                time.sleep(0.05)
+            raise RuntimeError("timeout")
+        finally:
+            for s in streams: s[2].abort()
+
+def _stream_curriculum(model_name, payload, scratch, live, deadline):
+    url = f"{gemini_base_url}/v1beta/models/{model_name}:streamGenerateContent?alt=sse&key={google_api_key}"
+    parser = MissionStreamParser(); attempt_deadline = min(deadline, time.monotonic() + GEMINI_ATTEMPT_DEADLINE)
+    with trace_call("gemini", "stream", model=model_name, bytes_in=len(json.dumps(payload, ensure_ascii=False).encode("utf-8")), bytes_out=0) as rec, \
+            get_http_session().post(url, json=payload, stream=True, timeout=GEMINI_ATTEMPT_TIMEOUT) as response, \
+            live.track(response, attempt_deadline):
+        t0 = time.perf_counter()
+        if response.status_code != 200: raise RuntimeError(f"{model_name}: {response.status_code}")
+        for line in response.iter_lines():
+            _check_attempt(model_name, live, attempt_deadline)
+            if not line.startswith(b"data:"): continue
+            rec["bytes_out"] += len(line)
+            chunk = json.loads(line[5:].decode("utf-8"))
+            rec["tokens"] = chunk.get("usageMetadata", {}).get("totalTokenCount", rec.get("tokens"))
+            parts = chunk.get('candidates', [{}])[0].get('content', {}).get('parts', [])
+            for field, value in parser.feed("".join(p.get('text', '') for p in parts)):
+                if field == "practice_sentences[]": scratch["practice_sentences"].append(value)
+                elif field != "practice_sentences": scratch[field] = value
+            if "first_content_ms" not in rec and "grammar" in scratch and "words" in scratch:
+                rec["first_content_ms"] = (time.perf_counter() - t0) * 1000
+        _check_attempt(model_name, live, attempt_deadline)
+
+def abort_response(response):
+    # 다른 스레드에서 읽기를 기다리는 연결을 끊음: close()로는 막힌 recv가 깨지지 않으므로 소켓을 shutdown
+    # 본문을 읽는 쪽 소켓을 먼저 찾음 (응답 길이가 없으면 http.client가 연결의 sock을 미리 놓아버림)
+    # 읽던 스레드는 바로 빠져나와 자기 with 블록에서 응답을 닫음
+    fp = getattr(getattr(getattr(response.raw, "_fp", None), "fp", None), "raw", None)
+    sock = getattr(fp, "_sock", None) or getattr(getattr(response.raw, "_connection", None), "sock", None)
+    try:
+        if sock is not None: sock.shutdown(socket.SHUT_RDWR)
+        else: response.close()
+    except Exception: pass
+
+class LiveAttempts:
+    # 한 번의 헤지 요청에 속한 진행 중 응답들: 취소하면 조정하는 쪽이 연결을 직접 끊고, 시도별 마감은 타이머가 끊음
+    def __init__(self):
+        self.cancel = threading.Event(); self.lock = threading.Lock(); self.responses = set()
+
+    @contextmanager
+    def track(self, response, deadline):
+        timer = threading.Timer(max(0.0, deadline - time.monotonic()), abort_response, [response]); timer.daemon = True
+        with self.lock: self.responses.add(response)
+        timer.start()
         try:
-            response = requests.post(url, headers=headers, json=payload)
+            if self.cancel.is_set(): abort_response(response)
+            yield response
+        finally:
+            timer.cancel()
+            with self.lock: self.responses.discard(response)
+
+    def abort(self):
+        self.cancel.set()
+        with self.lock: responses = list(self.responses)
+        for response in responses: abort_response(response)
+
+def _check_attempt(model_name, live, deadline):
+    if live.cancel.is_set(): raise RuntimeError(f"{model_name}: cancelled")
+    if time.monotonic() > deadline: raise RuntimeError(f"{model_name}: timeout")
+
+def _gemini_attempt(model_name, payload, live, deadline):
+    # 모델 1개 시도: 429/5xx는 지터 백오프로 재시도
+    # 응답을 스트리밍(SSE)으로 받고, 취소되거나 시도 마감(GEMINI_ATTEMPT_DEADLINE)이 지나면 연결을 끊어 워커를 바로 돌려줌
+    url = f"{gemini_base_url}/v1beta/models/{model_name}:streamGenerateContent?alt=sse&key={google_api_key}"
+    payload_bytes = len(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+    for attempt in range(GEMINI_MAX_RETRIES + 1):
+        if live.cancel.is_set(): raise RuntimeError(f"{model_name}: cancelled")
+        attempt_deadline = min(deadline, time.monotonic() + GEMINI_ATTEMPT_DEADLINE)
+        with trace_call("gemini", "generateContent", model=model_name, attempt=attempt, bytes_in=payload_bytes, bytes_out=0) as rec, \
+                get_http_session().post(url, json=payload, stream=True, timeout=GEMINI_ATTEMPT_TIMEOUT) as response, \
+                live.track(response, attempt_deadline):
+            rec["status"] = response.status_code; rec["ok"] = int(response.status_code == 200)
+            text = []
             if response.status_code == 200:
-                result = response.json()
-                return json.loads(result['candidates'][0]['content']['parts'][0]['text'])
-            else:
-                last_error_details.append(f"{model_name}: {response.status_code}")
-                continue
-        except Exception as e:
-            last_error_details.append(str(e))
-            continue
-    
-    return {"error": "\n".join(last_error_details)}
+                for line in response.iter_lines():
+                    _check_attempt(model_name, live, attempt_deadline)
+                    if not line.startswith(b"data:"): continue
+                    rec["bytes_out"] += len(line)
+                    chunk = json.loads(line[5:].decode("utf-8"))
+                    rec["tokens"] = chunk.get("usageMetadata", {}).get("totalTokenCount", rec.get("tokens"))
+                    text.extend(p.get('text', '') for p in chunk.get('candidates', [{}])[0].get('content', {}).get('parts', []))
+                _check_attempt(model_name, live, attempt_deadline)  # 연결을 끊어서 끝난 경우
+        if response.status_code == 200:
+            mission = json.loads("".join(text))
+            if not is_valid_mission(mission): raise RuntimeError(f"{model_name}: invalid schema")
+            return mission
+        if (response.status_code != 429 and response.status_code < 500) or attempt == GEMINI_MAX_RETRIES:
+            raise RuntimeError(f"{model_name}: {response.status_code}")
+        live.cancel.wait(min(min(8.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.5), max(0.0, deadline - time.monotonic())))
+
+def gemini_generate_hedged(payload, deadline=None):
+    # 주 모델을 먼저 보내고, 지연되거나 실패하면 다음 후보를 병렬로 추가 → 가장 먼저 온 유효 응답 사용
+    pool = get_gemini_pool(); live = LiveAttempts()
+    candidates = list(GEMINI_MODELS); pending = {}; last_error_details = []
+    deadline = deadline or time.monotonic() + GEMINI_TOTAL_DEADLINE
+    with trace_call("gemini", "hedged", launched=0) as rec:
+        try:
+            while candidates or pending:
+                if candidates:
+                    model_name = candidates.pop(0); rec["launched"] += 1
+                    pending[pool.submit(_gemini_attempt, model_name, payload, live, deadline)] = model_name
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    last_error_details.append("timeout"); break
+                done, _ = wait(pending, timeout=min(GEMINI_HEDGE_DELAY, remaining) if candidates else remaining, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    model_name = pending.pop(fut)
+                    try: mission = fut.result()
+                    except Exception as e: last_error_details.append(str(e)); continue
+                    rec["model"] = model_name; rec["fallback"] = model_name != GEMINI_MODELS[0]
+                    return model_name, mission
+        finally:
+            live.abort()  # 실행 중인 시도는 연결을 끊어 바로 끝냄
+            for fut in pending: fut.cancel()  # 아직 시작하지 않은 시도는 바로 취소
+        raise RuntimeError("\n".join(last_error_details))
+
+def audio_digest(audio_bytes):
+    # 프로세스가 달라도 같은 녹음이면 같은 값 (hash()는 실행마다 달라지고 충돌 가능)
+    return hashlib.sha256(audio_bytes).hexdigest()
+
+def preprocess_speech(wav_bytes):
+    # 업로드 전 모노 16kHz로 줄이고 앞뒤 무음을 잘라 FLAC(없으면 16bit WAV)으로 인코딩
+    try:
+        with wave.open(io.BytesIO(wav_bytes)) as w:
+            channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+            frames = w.readframes(w.getnframes())
+    except Exception: return wav_bytes, "input.wav"
+    if width != 2 or not frames: return wav_bytes, "input.wav"
+    import numpy as np
+
+    pcm = np.frombuffer(frames[:len(frames) - len(frames) % (2 * channels)], dtype="<i2").astype(np.float32)
+    if channels > 1: pcm = pcm.reshape(-1, channels).mean(axis=1)
+    if rate != SPEECH_RATE:
+        if rate > SPEECH_RATE:
+            # 줄이기 전에 새 나이퀴스트(8kHz)의 90%에서 자르는 윈도 sinc 저역 통과 FIR(101탭, 블랙먼)로 앨리어싱 제거
+            cutoff = 0.45 * SPEECH_RATE / rate; n = np.arange(101) - 50
+            taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.blackman(101)
+            pcm = np.convolve(pcm, taps / taps.sum(), mode="same")
+        n_out = int(len(pcm) * SPEECH_RATE / rate)
+        pcm = np.interp(np.arange(n_out) * (rate / SPEECH_RATE), np.arange(len(pcm)), pcm)
+
+    # 20ms 구간 에너지가 최대치의 5% 이상인 첫/마지막 구간 사이만 남기고 앞뒤 0.2초 여유
+    win = SPEECH_RATE // 50
+    n_win = len(pcm) // win
+    if n_win:
+        rms = np.sqrt((pcm[:n_win * win].reshape(n_win, win) ** 2).mean(axis=1))
+        voiced = np.flatnonzero(rms > max(rms.max() * 0.05, 100.0))
+        if voiced.size:
+            pad = SPEECH_RATE // 5
+            pcm = pcm[max(0, voiced[0] * win - pad):(voiced[-1] + 1) * win + pad]
+    pcm16 = np.clip(pcm, -32768, 32767).astype("<i2")
+
+    out = io.BytesIO()
+    try:
+        import soundfile
+        soundfile.write(out, pcm16, SPEECH_RATE, format="FLAC")
+        return out.getvalue(), "input.flac"
+    except Exception:
+        out = io.BytesIO()
+        with wave.open(out, "wb") as w:
+            w.setnchannels(1); w.setsampwidth(2); w.setframerate(SPEECH_RATE); w.writeframes(pcm16.tobytes())
+        return out.getvalue(), "input.wav"
 
 def transcribe_audio(audio_bytes):
-    import io
-    f = io.BytesIO(audio_bytes)
-    f.name = "input.wav"
-    return client.audio.transcriptions.create(model="whisper-1", file=f).text
+    # 원본 녹음의 sha256으로 받아쓰기 결과를 캐시 → 같은 녹음은 다시 업로드하지 않음
+    store = get_transcript_store()
+    k = store.key(WHISPER_MODEL, audio_digest(audio_bytes))
+    return store.get_or_load(k, lambda: _whisper(audio_bytes).encode("utf-8")).decode("utf-8")
+
+def _whisper(audio_bytes):
+    data, name = preprocess_speech(audio_bytes)
+    f = io.BytesIO(data)
+    f.name = name
+    with trace_call("openai.whisper", WHISPER_MODEL, model=WHISPER_MODEL, bytes_in=len(data), raw_bytes=len(audio_bytes)) as rec:
+        text = get_openai_client().audio.transcriptions.create(model=WHISPER_MODEL, file=f).text
+        rec["bytes_out"] = len(text.encode("utf-8"))
+        return text
 
-# [수정됨] 채점 로직: 영어 절대 금지 & 한국어 피드백 강제
 def evaluate_practice(target, user_input):
+    # 모델 채점 결과는 (정답 문장, 정규화된 입력) 기준으로 모든 학생이 공유
+    store = get_grading_store()
+    k = store.key(GRADER_MODEL, target, " ".join(normalize_sentence(user_input)))
+    try: return store.get_or_load(k, lambda: _ask_grader(target, user_input).encode("utf-8")).decode("utf-8")
+    except Exception as e: return f"FAIL 오류: {str(e)}"
+
+# [수정됨] 채점 로직: 영어 절대 금지 & 한국어 피드백 강제
+def _ask_grader(target, user_input):
     prompt = f"""
     Role: Kind English Teacher for Korean Middle School Students.
     Task: Check the student's input against the Target Sentence.
@@ -235,11 +776,176 @@ def evaluate_practice(target, user_input):
     or
     FAIL [한국어 피드백]
     """
+    # Temperature를 0.2로 낮춰서 지시사항을 더 철저히 따르게 함
+    with trace_call("openai.chat", "grading", model=GRADER_MODEL) as rec:
+        res = get_openai_client().chat.completions.create(model=GRADER_MODEL, messages=[{"role":"system", "content":prompt}], temperature=0.2)
+        rec["tokens"] = getattr(res.usage, "total_tokens", None)
+    return res.choices[0].message.content
+
+# ==========================================
+# 화면 조각: 상호작용하면 해당 조각만 다시 실행됨
+# ==========================================
+@timed_fragment
+def render_perf_panel():
+    # 켜져 있을 때만 기록을 조회 (꺼져 있으면 재실행 비용 없음)
+    if not st.toggle("📊 성능 패널", key="perf_panel"): return
+    hours = st.select_slider("기간", options=[1, 6, 24, 72], value=24, format_func=lambda h: f"최근 {h}시간")
+    rows = get_perf_store().summary(time.time() - hours * 3600)
+    if rows: st.dataframe(rows, hide_index=True)
+    else: st.caption("기록이 없습니다.")
+    mine = st.session_state.rerun_ms
+    if mine: st.caption(f"이 세션 재실행: p50 {percentile(mine, 50):.0f}ms · p95 {percentile(mine, 95):.0f}ms ({len(mine)}회)")
+
+@timed_fragment
+def render_keyset_table(key, fetch, cursor_of):
+    # keyset 페이지네이션: 쪽마다 이전 쪽 마지막 행의 커서를 쌓아두고, 한 행 더 받아서 다음 쪽 유무를 판단
+    pages = st.session_state.setdefault(f"{key}_pages", [None])
+    rows = fetch(pages[-1], TEACHER_PAGE_SIZE + 1)
+    more = len(rows) > TEACHER_PAGE_SIZE; rows = rows[:TEACHER_PAGE_SIZE]
+    if rows: st.dataframe(rows, hide_index=True)
+    else: st.caption("기록이 없습니다.")
+    c1, c2, c3 = st.columns([1, 1, 3])
+    if c1.button("◀ 이전", key=f"{key}_prev", disabled=len(pages) == 1): pages.pop(); rerun_fragment()
+    if c2.button("다음 ▶", key=f"{key}_next", disabled=not more): pages.append(cursor_of(rows[-1])); rerun_fragment()
+    c3.caption(f"{len(pages)}쪽")
+
+def render_teacher_dashboard():
+    today = date.today().isoformat()
+    st.title("📊 교사용 대시보드")
+    if st.button("🔄 새로고침", help=f"통계는 {TEACHER_CACHE_TTL // 60}분마다 자동으로 갱신됩니다."):
+        for fn in (teacher_daily_completion, teacher_streak_distribution, teacher_missed_words, teacher_students): fn.clear()
     try:
-        # Temperature를 0.2로 낮춰서 지시사항을 더 철저히 따르게 함
-        res = client.chat.completions.create(model="gpt-4o-mini", messages=[{"role":"system", "content":prompt}], temperature=0.2)
-        return res.choices[0].message.content
-    except Exception as e: return f"FAIL 오류: {str(e)}"
+        completion = teacher_daily_completion(today, 14); streaks = teacher_streak_distribution(today)
+    except Exception as e: st.error(f"통계를 불러오지 못했습니다: {e}"); return
+    c1, c2 = st.columns(2)
+    with c1:
+        st.subheader("날짜별 학습 완료율")
+        st.bar_chart(completion, x="day", y="completion_rate", y_label="완료율", x_label="")
+        st.caption(f"오늘 출석 {completion[-1]['visitors']}명 · 완료 {completion[-1]['completers']}명" if completion else "")
+    with c2:
+        st.subheader("연속 학습 분포")
+        st.bar_chart(streaks, x="bucket", y="students", y_label="학생 수", x_label="", sort=False)
+    st.divider()
+    st.subheader("문법 단원별 많이 틀린 단어")
+    grammar_idx = st.selectbox("문법 단원", list(range(len(GRAMMAR_SYLLABUS))) + [-1], key="teacher_grammar",
+                               format_func=lambda i: f"{i + 1}. {GRAMMAR_SYLLABUS[i]}" if i >= 0 else "단원 정보 없음 (복습 단어 등)",
+                               on_change=lambda: st.session_state.pop("missed_words_pages", None))
+    render_keyset_table("missed_words", lambda cursor, limit: teacher_missed_words(grammar_idx, *(cursor or (None, None)), limit),
+                        lambda row: (row["misses"], row["word"]))
+    st.divider()
+    st.subheader("학생 목록")
+    render_keyset_table("students", lambda cursor, limit: teacher_students(today, cursor, limit), lambda row: row["user_id"])
+
+@timed_fragment
+def render_word_list(words):
+    for i, w in enumerate(words):
+        c1, c2, c3 = st.columns([1, 4, 1])
+        with c1: st.write(f"**{i+1}.**")
+        with c2: st.write(f"**{w['en']}** : {w['ko']}")
+        with c3: play_tts("🔊", w['en'], f"tts_w_{i}")
+
+@timed_fragment
+def render_practice_question(idx, q):
+    result_key = f"res_{idx}"; input_key = f"input_{idx}"; grade_job = f"grade_{idx}"; stt_job = f"stt_{idx}"
+    done, res = pop_job(grade_job)
+    if done: st.session_state.practice_results[result_key] = practice_verdict(res or "FAIL 채점 오류", st.session_state.practice_results.get(result_key, {}).get('input', ''))
+    is_pass = (result_key in st.session_state.practice_results and st.session_state.practice_results[result_key]['status'] == 'PASS')
+    
+    with st.expander(f"Q{idx+1}. {q['ko']}", expanded=not is_pass):
+        st.caption(f"💡 구조: {q.get('hint_structure','')} | 🔑 문법: {q.get('hint_grammar','')}")
+        mic_col, _ = st.columns([1, 5])
+        with mic_col:
+            audio_val = audio_recorder(text="", key=f"mic_{idx}", icon_size="lg", neutral_color="#6aa36f", recording_color="#e8b62c")
+        
+        if audio_val:
+            current_audio_hash = audio_digest(audio_val)
+            prev_audio_key = f"prev_audio_{idx}"
+            if prev_audio_key not in st.session_state.last_processed_audio or st.session_state.last_processed_audio[prev_audio_key] != current_audio_hash:
+                submit_job(stt_job, transcribe_audio, audio_val)
+                st.session_state.last_processed_audio[prev_audio_key] = current_audio_hash 
+
+        done, text = pop_job(stt_job)
+        if done and text: st.session_state[input_key] = text
+        elif is_job_pending(stt_job): st.caption("🎙️ 받아쓰는 중...")
+
+        with st.form(key=f"form_p_{idx}"):
+            user_val = st.text_input("영어 문장 입력", key=input_key)
+            if st.form_submit_button("제출"):
+                if not user_val.strip(): st.warning("입력해주세요.")
+                else:
+                    res = grade_locally(q['en'], user_val)
+                    if res is None:
+                        submit_job(grade_job, evaluate_practice, q['en'], user_val)
+                        st.session_state.practice_results[result_key] = {'status': 'PENDING', 'input': user_val}
+                    else: st.session_state.practice_results[result_key] = practice_verdict(res, user_val)
+        
+        if result_key in st.session_state.practice_results:
+            res = st.session_state.practice_results[result_key]
+            if res['status'] == 'PASS': st.success(f"🎉 정답! : {res['input']}")
+            elif res['status'] == 'PENDING': st.info(f"⏳ 채점 중... : {res['input']}")
+            else: st.error("❌ 오답"); st.info(f"피드백: {res['feedback']}")
+        if is_job_pending(grade_job) or is_job_pending(stt_job): watch_background([grade_job, stt_job])
+
+def miss_word(qs, word_obj):
+    # 틀린 단어는 이번 단계가 끝난 뒤 재도전 목록으로
+    if all(w['en'] != word_obj['en'] for w in qs["wrong_words"]): qs["wrong_words"].append(word_obj)
+
+@timed_fragment
+def render_quiz(mission, user_id):
+    qs = st.session_state.quiz_state; words = qs["shuffled_words"]
+    if not words and qs["phase"] == "ready":
+        if st.button("🚀 실전 테스트 시작"):
+            grammar_idx = st.session_state.get("grammar_idx")
+            today = [{**w, "grammar_idx": grammar_idx} for w in random.sample(mission['words'], min(20, len(mission['words'])))]
+            seen = {w['en'].lower() for w in today}
+            reviews = [w for w in fetch_due_reviews(user_id) if w['en'].lower() not in seen]
+            qs["shuffled_words"] = today + reviews; random.shuffle(qs["shuffled_words"]); qs["phase"] = "mc"; rerun_fragment()
+    elif qs["phase"] == "end":
+        st.balloons(); st.success(f"🎉 {qs['loop_count']}회차 완료!")
+        if st.button("학습 종료"):
+            flush_quiz_results(user_id)
+            if st.session_state.quiz_results: st.error("오답 기록을 저장하지 못했습니다. 잠시 후 다시 눌러주세요.")
+            else:
+                complete_daily_mission(user_id)
+                for key in ["mission", "quiz_state", "practice_results", "last_processed_audio", "quiz_results", "grammar_idx", "jobs"]: 
+                    if key in st.session_state: del st.session_state[key]
+                st.rerun()
+    elif words:
+        total = len(words); curr = qs["current_idx"]; target = words[curr]
+        st.progress((curr + 1) / total, text=f"문제 {curr + 1} / {total}")
+        if target.get("review"): st.caption("🔁 복습 단어")
+        if qs["phase"] == "mc":
+            st.subheader(f"객관식: {target['en']}")
+            if qs["current_options"] is None:
+                opts = [target['ko']]
+                while len(opts) < 4:
+                    r = random.choice(mission['words'])['ko']
+                    if r not in opts: opts.append(r)
+                random.shuffle(opts); qs["current_options"] = opts
+            with st.form(f"quiz_mc_{curr}"):
+                choice = st.radio("뜻 선택", qs["current_options"])
+                if st.form_submit_button("확인"):
+                    record_quiz_answer(target, choice == target['ko'])
+                    if choice == target['ko']: st.toast("정답! ⭕")
+                    else: st.toast("오답!"); miss_word(qs, target)
+                    qs["current_options"] = None
+                    if curr + 1 < total: qs["current_idx"] += 1; rerun_fragment()
+                    else: flush_quiz_results(user_id); qs["phase"] = "writing"; qs["current_idx"] = 0; random.shuffle(qs["shuffled_words"]); rerun_fragment()
+        elif qs["phase"] == "writing":
+            st.subheader(f"주관식: {target['ko']}")
+            set_focus_js()
+            with st.form(f"quiz_wr_{curr}", clear_on_submit=True):
+                inp = st.text_input("영어 단어 입력")
+                if st.form_submit_button("제출"):
+                    correct = inp.strip().lower() == target['en'].lower()
+                    record_quiz_answer(target, correct)
+                    if correct: st.toast("정답! ⭕")
+                    else: st.toast("오답!"); miss_word(qs, target)
+                    if curr + 1 < total: qs["current_idx"] += 1; rerun_fragment()
+                    else:
+                        flush_quiz_results(user_id)
+                        if qs["wrong_words"]: qs["shuffled_words"] = qs["wrong_words"][:]; qs["wrong_words"] = []; qs["current_idx"] = 0; qs["loop_count"] += 1; st.toast("오답 재도전!"); qs["phase"] = "mc"; rerun_fragment()
+                        else: qs["phase"] = "end"; rerun_fragment()
 
 # ==========================================
 # 3. 메인 화면 로직
@@ -249,20 +955,24 @@ with st.sidebar:
     with st.expander("🛠️ 연결 상태 확인", expanded=False):
         if st.button("모델 확인"):
             try:
-                test_url = f"https://generativelanguage.googleapis.com/v1beta/models?key={google_api_key}"
-                res = requests.get(test_url).json()
+                test_url = f"{gemini_base_url}/v1beta/models?key={google_api_key}"
+                res = get_http_session().get(test_url, timeout=10).json()
                 models = [m['name'] for m in res.get('models', []) if 'generateContent' in m['supportedGenerationMethods']]
                 st.success(f"성공: {len(models)}개")
             except Exception as e: st.error(f"실패: {e}")
+        render_perf_panel()
     st.divider()
-    user_id = st.text_input("아이디", value="student1")
+    user_id = st.text_input("아이디", value="student1", key="user_id")
+    teacher_mode = bool(teacher_code) and st.text_input("교사 코드", type="password", key="teacher_code") == teacher_code
+
+if teacher_mode: render_teacher_dashboard(); record_rerun(); st.stop()
 
 if not user_id: st.warning("아이디를 입력하세요."); st.stop()
 
 streak = login_and_update_attendance(user_id)
 user_data = st.session_state.user_info 
 
-current_level = user_data.get('current_level')
+current_level = normalize_level(user_data.get('current_level'))  # 예전에 모델 응답 그대로 저장된 값도 맞춤
 total_complete = user_data.get('total_complete_count', 0)
 last_test_cnt = user_data.get('last_test_count', 0)
 
@@ -277,139 +987,68 @@ if current_level is None:
     st.subheader("📝 레벨 테스트"); st.write("Q. What do you usually do on weekends?")
     aud = audio_recorder(text="", key="lvl_rec", neutral_color="#6aa36f", recording_color="#e8b62c")
     if aud:
-        aud_hash = hash(aud)
+        aud_hash = audio_digest(aud)
         if "lvl_test_audio" not in st.session_state or st.session_state.lvl_test_audio != aud_hash:
-            txt = transcribe_audio(aud)
             st.session_state.lvl_test_audio = aud_hash
-            st.write(f"답변: {txt}")
-            if len(txt) > 1:
-                lvl = run_level_test_ai(txt)
-                update_level_and_test_log(user_id, lvl)
-                st.success(f"완료: {lvl}")
-                time.sleep(1.5)
-                st.rerun()
+            submit_job("level_test", level_test_job, aud)
+    done, result = pop_job("level_test")
+    if done and result:
+        txt, lvl = result
+        st.write(f"답변: {txt}")
+        if lvl:
+            update_level_and_test_log(user_id, lvl)
+            st.toast(f"완료: {lvl}")
+            st.rerun()
+    elif done: st.error("채점에 실패했습니다. 다시 녹음해주세요.")
+    elif is_job_pending("level_test"):
+        st.info("⏳ 채점 중..."); watch_background(["level_test"])
     st.stop()
 
 if not st.session_state.mission:
     with st.status("🚀 오늘의 미션을 생성하고 있습니다... (중1 문법 커리큘럼 적용)", expanded=True) as status:
-        today_key = date.today().isoformat()
-        mission_data = generate_curriculum(current_level, today_key, total_complete)
+        mission_data = generate_curriculum(current_level, total_complete, stream=GEMINI_STREAMING)
         
-        if mission_data and "error" in mission_data:
-            status.update(label="오류", state="error"); st.error(mission_data["error"]); st.stop()
+        if mission_data and not wait_for_first_content(mission_data):
+            status.update(label="오류", state="error"); st.error(mission_data.get("error", "시간 초과")); st.stop()
         elif mission_data:
             st.session_state.mission = mission_data; status.update(label="완료!", state="complete", expanded=False)
+            st.session_state.grammar_idx = curriculum_inputs(total_complete)[0]
+            prefetch_audio([w['en'] for w in mission_data['words']] + [grammar_tts_text(mission_data['grammar'])])
         else: status.update(label="오류", state="error"); st.stop()
 
 mission = st.session_state.mission
-st.subheader(f"Topic: {mission['topic']}")
+stream_seen = len(mission['practice_sentences'])  # 스트리밍 중이면 이번 실행에서 그리는 예문 수
+st.subheader(f"Topic: {mission.get('topic', '')}")
 
-tab1, tab2, tab3, tab4 = st.tabs(["📘 오늘의 문법", "🍎 오늘의 단어", "✍️ 문장 연습", "⚔️ 실전 테스트"])
+tab1, tab2, tab3, tab4 = st.tabs(["📘 오늘의 문법", "🍎 오늘의 단어", "✍️ 문장 연습", "⚔️ 실전 테스트"], key="active_tab", on_change="rerun")
 
-with tab1:
-    gr = mission['grammar']
-    st.subheader(gr['title'])
-    st.markdown(gr['description'])
-    st.info(f"📌 공식: {gr.get('rule', '')}")
-    st.markdown(f"💡 예문: *{gr['example']}*")
-    st.divider()
-    # [수정됨] 문법 에러 수정: 따옴표 닫기 완료
-    if st.button("🔊 문법 설명 듣기"):
-        with st.spinner("생성 중..."):
-            tts_text = f"오늘의 문법은 {gr['title']}입니다. {gr['description']} 예를 들어 {gr['example']} 처럼 씁니다."
-            audio = get_audio_bytes(tts_text)
-            if audio: st.audio(audio, format='audio/mp3')
-
-with tab2:
-    st.info("💡 단어를 학습하세요.")
-    for i, w in enumerate(mission['words']):
-        c1, c2, c3 = st.columns([1, 4, 1])
-        with c1: st.write(f"**{i+1}.**")
-        with c2: st.write(f"**{w['en']}** : {w['ko']}")
-        with c3:
-            if st.button("🔊", key=f"tts_w_{i}"):
-                audio = get_audio_bytes(w['en'])
-                if audio: st.audio(audio, format='audio/mp3', autoplay=True)
-
-with tab3:
-    st.markdown("### ✍️ 문장 만들기 연습")
-    st.caption(f"오늘의 문법 **[{mission['grammar']['title']}]**을 활용해 영작하세요.")
-    for idx, q in enumerate(mission['practice_sentences']):
-        result_key = f"res_{idx}"; input_key = f"input_{idx}"
-        is_pass = (result_key in st.session_state.practice_results and st.session_state.practice_results[result_key]['status'] == 'PASS')
-        
-        with st.expander(f"Q{idx+1}. {q['ko']}", expanded=not is_pass):
-            st.caption(f"💡 구조: {q.get('hint_structure','')} | 🔑 문법: {q.get('hint_grammar','')}")
-            mic_col, _ = st.columns([1, 5])
-            with mic_col:
-                audio_val = audio_recorder(text="", key=f"mic_{idx}", icon_size="lg", neutral_color="#6aa36f", recording_color="#e8b62c")
-            
-            if audio_val:
-                current_audio_hash = hash(audio_val)
-                prev_audio_key = f"prev_audio_{idx}"
-                if prev_audio_key not in st.session_state.last_processed_audio or st.session_state.last_processed_audio[prev_audio_key] != current_audio_hash:
-                    st.session_state[input_key] = transcribe_audio(audio_val)
-                    st.session_state.last_processed_audio[prev_audio_key] = current_audio_hash 
-                    st.rerun()
-
-            with st.form(key=f"form_p_{idx}"):
-                user_val = st.text_input("영어 문장 입력", key=input_key)
-                if st.form_submit_button("제출"):
-                    if not user_val.strip(): st.warning("입력해주세요.")
-                    else:
-                        if user_val.lower().replace(".","").strip() == q['en'].lower().replace(".","").strip():
-                            st.session_state.practice_results[result_key] = {'status': 'PASS', 'input': user_val}
-                        else:
-                            with st.spinner("채점 중..."): res = evaluate_practice(q['en'], user_val)
-                            if "PASS" in res: st.session_state.practice_results[result_key] = {'status': 'PASS', 'input': user_val}
-                            else: st.session_state.practice_results[result_key] = {'status': 'FAIL', 'input': user_val, 'feedback': res.replace("FAIL", "").strip()}
-            
-            if result_key in st.session_state.practice_results:
-                res = st.session_state.practice_results[result_key]
-                if res['status'] == 'PASS': st.success(f"🎉 정답! : {res['input']}")
-                else: st.error("❌ 오답"); st.info(f"피드백: {res['feedback']}")
-
-with tab4:
-    qs = st.session_state.quiz_state; words = qs["shuffled_words"]
-    if not words and qs["phase"] == "ready":
-        if st.button("🚀 실전 테스트 시작"):
-            qs["shuffled_words"] = random.sample(mission['words'], 20); qs["phase"] = "mc"; st.rerun()
-    elif qs["phase"] == "end":
-        st.balloons(); st.success(f"🎉 {qs['loop_count']}회차 완료!")
-        if st.button("학습 종료"):
-            complete_daily_mission(user_id)
-            for key in ["mission", "audio_cache", "quiz_state", "practice_results", "last_processed_audio"]: 
-                if key in st.session_state: del st.session_state[key]
-            st.rerun()
-    elif words:
-        total = len(words); curr = qs["current_idx"]; target = words[curr]
-        st.progress((curr + 1) / total, text=f"문제 {curr + 1} / {total}")
-        if qs["phase"] == "mc":
-            st.subheader(f"객관식: {target['en']}")
-            if qs["current_options"] is None:
-                opts = [target['ko']]
-                while len(opts) < 4:
-                    r = random.choice(mission['words'])['ko']
-                    if r not in opts: opts.append(r)
-                random.shuffle(opts); qs["current_options"] = opts
-            with st.form(f"quiz_mc_{curr}"):
-                choice = st.radio("뜻 선택", qs["current_options"])
-                if st.form_submit_button("확인"):
-                    if choice == target['ko']: st.success("정답! ⭕")
-                    else: st.error("오답!"); save_wrong_word_db(user_id, target)
-                    time.sleep(0.5); qs["current_options"] = None
-                    if curr + 1 < total: qs["current_idx"] += 1; st.rerun()
-                    else: qs["phase"] = "writing"; qs["current_idx"] = 0; random.shuffle(qs["shuffled_words"]); st.rerun()
-        elif qs["phase"] == "writing":
-            st.subheader(f"주관식: {target['ko']}")
-            set_focus_js()
-            with st.form(f"quiz_wr_{curr}", clear_on_submit=True):
-                inp = st.text_input("영어 단어 입력")
-                if st.form_submit_button("제출"):
-                    if inp.strip().lower() == target['en'].lower(): st.success("정답! ⭕")
-                    else: st.error("오답!"); save_wrong_word_db(user_id, target)
-                    time.sleep(0.5)
-                    if curr + 1 < total: qs["current_idx"] += 1; st.rerun()
-                    else:
-                        if qs["wrong_words"]: qs["shuffled_words"] = qs["wrong_words"][:]; qs["wrong_words"] = []; qs["current_idx"] = 0; qs["phase"] = "ready"; qs["loop_count"] += 1; st.warning("오답 재도전!"); time.sleep(1); qs["phase"] = "mc"; st.rerun()
-                        else: qs["phase"] = "end"; st.rerun()
\ No newline at end of file
+# 선택된 탭의 내용만 실행
+if tab1.open:
+    with tab1:
+        gr = mission['grammar']
+        st.subheader(gr['title'])
+        st.markdown(gr['description'])
+        st.info(f"📌 공식: {gr.get('rule', '')}")
+        st.markdown(f"💡 예문: *{gr['example']}*")
+        st.divider()
+        # [수정됨] 문법 에러 수정: 따옴표 닫기 완료
+        play_tts("🔊 문법 설명 듣기", grammar_tts_text(gr), "tts_grammar", autoplay=False)
+
+if tab2.open:
+    with tab2:
+        st.info("💡 단어를 학습하세요.")
+        render_word_list(mission['words'])
+
+if tab3.open:
+    with tab3:
+        st.markdown("### ✍️ 문장 만들기 연습")
+        st.caption(f"오늘의 문법 **[{mission['grammar']['title']}]**을 활용해 영작하세요.")
+        for idx, q in enumerate(mission['practice_sentences'][:stream_seen]): render_practice_question(idx, q)
+        if mission.get("_streaming"):
+            st.caption(f"⏳ 문장을 더 만드는 중... ({stream_seen}개 준비됨)")
+            watch_background(mission=mission, seen=stream_seen)
+
+if tab4.open:
+    with tab4: render_quiz(mission, user_id)
+
+record_rerun()
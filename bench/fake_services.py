@@ -0,0 +1,303 @@
+# 부하 테스트용 가짜 Gemini / OpenAI / Supabase 서버
+# 서비스마다 127.0.0.1의 임의 포트에 ThreadingHTTPServer를 띄우고, app.py가 쓰는 만큼만 흉내 냅니다.
+# 모든 서비스는 경로별 호출 수를 세고, 고정 지연·지터·503 오류 주입을 지원합니다.
+import datetime
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+
+class FakeService:
+    name = "service"
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.calls = Counter()
+        self.lock = threading.Lock()
+        self.server = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                service._dispatch(self, "GET")
+
+            def do_POST(self):
+                service._dispatch(self, "POST")
+
+            def do_PATCH(self):
+                service._dispatch(self, "PATCH")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def total_calls(self):
+        with self.lock:
+            return sum(self.calls.values())
+
+    def _dispatch(self, req, method):
+        parts = urlsplit(req.path)
+        length = int(req.headers.get("Content-Length") or 0)
+        body = req.rfile.read(length) if length else b""
+        route = self.route(method, parts.path)
+        with self.lock:
+            self.calls[route] += 1
+            fail = self.rng.random() < self.error_rate
+            delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+        time.sleep(delay)
+        if fail:
+            return self._send(req, 503, {"error": {"code": 503, "message": "injected failure"}})
+        try:
+            self.handle(req, method, parts.path, dict(parse_qsl(parts.query)), body)
+        except Exception as e:
+            self._send(req, 500, {"error": {"code": 500, "message": repr(e)}})
+
+    def route(self, method, path):
+        return f"{method} {path}"
+
+    def handle(self, req, method, path, query, body):
+        raise NotImplementedError
+
+    @staticmethod
+    def _send(req, status, payload, content_type="application/json"):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        req.send_response(status)
+        req.send_header("Content-Type", content_type)
+        req.send_header("Content-Length", str(len(data)))
+        req.end_headers()
+        req.wfile.write(data)
+
+
+def fake_mission(grammar, topic, n=20):
+    return {
+        "topic": f"{topic} ({topic})",
+        "grammar": {"title": grammar, "description": "쉬운 한국어 설명입니다.", "rule": "Subject + Verb", "example": "I am a student."},
+        "words": [{"en": f"word{i}", "ko": f"뜻{i}"} for i in range(n)],
+        "practice_sentences": [
+            {"ko": f"나는 학생{i}이다.", "en": f"I am student {i}.", "hint_structure": "Subject + Verb + Noun", "hint_grammar": "be동사"}
+            for i in range(n)
+        ],
+    }
+
+
+class FakeGemini(FakeService):
+    name = "gemini"
+
+    def __init__(self, stream_chunk=400, stream_delay=0.01, **kw):
+        super().__init__(**kw)
+        self.stream_chunk = stream_chunk
+        self.stream_delay = stream_delay
+
+    def route(self, method, path):
+        return path.rsplit(":", 1)[-1] if ":" in path else f"{method} {path}"
+
+    def handle(self, req, method, path, query, body):
+        if method == "GET":
+            return self._send(req, 200, {"models": [{"name": "models/gemini-flash-latest", "supportedGenerationMethods": ["generateContent"]}]})
+        prompt = json.loads(body)["contents"][0]["parts"][0]["text"]
+        grammar = re.search(r'Use \*\*"(.+?)"\*\*', prompt)
+        topic = re.search(r"\*\*Topic:\*\* (.+?)\.\n", prompt)
+        text = json.dumps(fake_mission(grammar.group(1) if grammar else "grammar", topic.group(1) if topic else "topic"), ensure_ascii=False)
+        usage = {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4, "totalTokenCount": (len(prompt) + len(text)) // 4}
+        if path.endswith(":streamGenerateContent"):
+            req.send_response(200)
+            req.send_header("Content-Type", "text/event-stream")
+            req.send_header("Connection", "close")
+            req.end_headers()
+            for i in range(0, len(text), self.stream_chunk):
+                chunk = {"candidates": [{"content": {"parts": [{"text": text[i:i + self.stream_chunk]}]}}], "usageMetadata": usage}
+                req.wfile.write(b"data: " + json.dumps(chunk, ensure_ascii=False).encode("utf-8") + b"\r\n\r\n")
+                req.wfile.flush()
+                time.sleep(self.stream_delay)
+            req.close_connection = True
+            return
+        self._send(req, 200, {"candidates": [{"content": {"parts": [{"text": text}]}}], "usageMetadata": usage})
+
+
+class FakeOpenAI(FakeService):
+    name = "openai"
+
+    def __init__(self, transcript="I am student 0.", tts_bytes=6000, **kw):
+        super().__init__(**kw)
+        self.transcript = transcript
+        self.tts_bytes = tts_bytes
+
+    def handle(self, req, method, path, query, body):
+        if path.endswith("/chat/completions"):
+            messages = json.loads(body)["messages"]
+            content = "Mid" if "Evaluate English level" in messages[0]["content"] else "FAIL 동사의 형태를 다시 확인해 보세요."
+            usage = {"prompt_tokens": sum(len(m["content"]) for m in messages) // 4, "completion_tokens": len(content) // 4}
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+            return self._send(req, 200, {
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": "gpt-4o-mini",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+        if path.endswith("/audio/speech"):
+            return self._send(req, 200, b"ID3" + b"\0" * self.tts_bytes, content_type="audio/mpeg")
+        if path.endswith("/audio/transcriptions"):
+            return self._send(req, 200, {"text": self.transcript})
+        self._send(req, 404, {"error": {"message": f"unknown path {path}"}})
+
+
+# users / study_logs / wrong_words 테이블과 sql/의 RPC를 메모리로 흉내 내는 PostgREST
+class FakeSupabase(FakeService):
+    name = "supabase"
+
+    def __init__(self, **kw):
+        super().__init__(**kw)
+        self.tables = {"users": [], "study_logs": [], "wrong_words": []}
+        self.next_id = 1
+        self.db_lock = threading.Lock()
+
+    def route(self, method, path):
+        return f"{method} {path.replace('/rest/v1/', '')}"
+
+    def handle(self, req, method, path, query, body):
+        payload = json.loads(body) if body else None
+        name = path.replace("/rest/v1/", "")
+        with self.db_lock:
+            if name.startswith("rpc/"):
+                fn = getattr(self, "rpc_" + name[4:], None)
+                if fn is None:
+                    return self._send(req, 404, {"message": f"function {name[4:]} not found"})
+                return self._send(req, 200, fn(**(payload or {})))
+            rows = self.tables.setdefault(name, [])
+            if method == "GET":
+                return self._send(req, 200, self._select(rows, query))
+            if method == "POST":
+                new_rows = payload if isinstance(payload, list) else [payload]
+                for row in new_rows:
+                    row.setdefault("id", self._id())
+                    rows.append(row)
+                return self._send(req, 201, new_rows)
+            if method == "PATCH":
+                matched = self._select(rows, query)
+                for row in matched:
+                    row.update(payload)
+                return self._send(req, 200, matched)
+
+    def _id(self):
+        self.next_id += 1
+        return self.next_id
+
+    @staticmethod
+    def _select(rows, query):
+        ops = {"eq": lambda a, b: str(a) == b, "lte": lambda a, b: a is not None and str(a) <= b,
+               "gte": lambda a, b: a is not None and str(a) >= b, "lt": lambda a, b: a is not None and str(a) < b,
+               "gt": lambda a, b: a is not None and str(a) > b}
+        out = rows
+        for col, expr in query.items():
+            if col in ("select", "order", "limit", "offset"):
+                continue
+            op, _, value = expr.partition(".")
+            out = [r for r in out if ops[op](r.get(col), unquote(value))]
+        if "order" in query:
+            col, _, direction = query["order"].partition(".")
+            out = sorted(out, key=lambda r: str(r.get(col)), reverse=direction.startswith("desc"))
+        if "limit" in query:
+            out = out[:int(query["limit"])]
+        return out
+
+    def _user(self, user_id):
+        return next((u for u in self.tables["users"] if u["user_id"] == user_id), None)
+
+    def rpc_login_and_touch_attendance(self, p_user_id, p_today):
+        user = self._user(p_user_id)
+        today = datetime.date.fromisoformat(p_today)
+        if user is None:
+            user = {"user_id": p_user_id, "current_level": None, "total_complete_count": 0, "last_test_count": 0, "streak": 1, "last_visit_date": p_today}
+            self.tables["users"].append(user)
+        elif user["last_visit_date"] != p_today:
+            yesterday = (today - datetime.timedelta(days=1)).isoformat()
+            user["streak"] = user["streak"] + 1 if user["last_visit_date"] == yesterday else 1
+            user["last_visit_date"] = p_today
+        return [dict(user)]
+
+    def rpc_complete_daily_mission(self, p_user_id, p_study_date):
+        self.tables["study_logs"].append({"id": self._id(), "user_id": p_user_id, "study_date": p_study_date, "completed_at": datetime.datetime.now().isoformat()})
+        user = self._user(p_user_id)
+        user["total_complete_count"] = (user["total_complete_count"] or 0) + 1
+        return user["total_complete_count"]
+
+    def rpc_record_quiz_results(self, p_user_id, p_items, p_now):
+        now = datetime.datetime.fromisoformat(p_now)
+        for item in p_items:
+            row = next((w for w in self.tables["wrong_words"] if w["user_id"] == p_user_id and w["word"] == item["word"]), None)
+            if item["misses"] > 0:
+                if row is None:
+                    row = {"id": self._id(), "user_id": p_user_id, "word": item["word"], "wrong_count": 0}
+                    self.tables["wrong_words"].append(row)
+                row.update(meaning=item["meaning"], wrong_count=row["wrong_count"] + item["misses"], box=1, interval_days=1,
+                           due_at=(now + datetime.timedelta(days=1)).isoformat(), last_reviewed_at=p_now)
+                if item.get("grammar_idx") is not None: row["grammar_idx"] = item["grammar_idx"]
+            elif row is not None and row.get("due_at", p_now) <= p_now:
+                days = 2 ** min(row.get("box", 1), 4)
+                row.update(box=min(row.get("box", 1) + 1, 5), interval_days=days,
+                           due_at=(now + datetime.timedelta(days=days)).isoformat(), last_reviewed_at=p_now)
+        return None
+
+    # 교사용 RPC (sql/004_teacher_analytics.sql): 집계 테이블 대신 원본 행에서 바로 계산
+    def _streak(self, user, today):
+        last = user.get("last_visit_date")
+        return user.get("streak") or 0 if last and last >= (today - datetime.timedelta(days=1)).isoformat() else 0
+
+    def rpc_teacher_daily_completion(self, p_today, p_days):
+        today = datetime.date.fromisoformat(p_today); out = []
+        for i in range(p_days - 1, -1, -1):
+            day = (today - datetime.timedelta(days=i)).isoformat()
+            completers = len({l["user_id"] for l in self.tables["study_logs"] if l["study_date"] == day})
+            visitors = max(completers, sum(1 for u in self.tables["users"] if u.get("last_visit_date") == day))
+            out.append({"day": day, "visitors": visitors, "completers": completers, "completion_rate": round(completers / visitors, 3) if visitors else None})
+        return out
+
+    def rpc_teacher_streak_distribution(self, p_today):
+        today = datetime.date.fromisoformat(p_today)
+        buckets = [("0일", 0, 0), ("1일", 1, 1), ("2-3일", 2, 3), ("4-6일", 4, 6), ("7-13일", 7, 13), ("14-29일", 14, 29), ("30일+", 30, 10 ** 9)]
+        streaks = [self._streak(u, today) for u in self.tables["users"]]
+        return [{"bucket": name, "students": sum(lo <= s <= hi for s in streaks)} for name, lo, hi in buckets]
+
+    def rpc_teacher_missed_words(self, p_grammar_idx, p_after_misses, p_after_word, p_limit):
+        agg = {}
+        for w in self.tables["wrong_words"]:
+            if (w.get("grammar_idx") if w.get("grammar_idx") is not None else -1) != p_grammar_idx: continue
+            row = agg.setdefault(w["word"], {"word": w["word"], "meaning": w["meaning"], "misses": 0, "students": 0})
+            row["misses"] += w["wrong_count"]; row["students"] += 1
+        rows = sorted(agg.values(), key=lambda r: (-r["misses"], r["word"]))
+        if p_after_misses is not None:
+            rows = [r for r in rows if r["misses"] < p_after_misses or (r["misses"] == p_after_misses and r["word"] > p_after_word)]
+        return rows[:p_limit]
+
+    def rpc_teacher_students(self, p_today, p_after_user_id, p_limit):
+        today = datetime.date.fromisoformat(p_today); now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        users = sorted((u for u in self.tables["users"] if p_after_user_id is None or u["user_id"] > p_after_user_id), key=lambda u: u["user_id"])
+        return [{"user_id": u["user_id"], "current_level": u.get("current_level"), "streak": self._streak(u, today),
+                 "total_complete_count": u.get("total_complete_count"), "last_visit_date": u.get("last_visit_date"),
+                 "due_reviews": sum(1 for w in self.tables["wrong_words"] if w["user_id"] == u["user_id"] and w.get("due_at", now) <= now)}
+                for u in users[:p_limit]]
@@ -0,0 +1,277 @@
+# 오프라인 부하 테스트: 가짜 서버(fake_services.py)에 붙인 app.py를 AppTest로 N명의 학생이 동시에 사용
+# AppTest는 스레드 간에 실행 컨텍스트가 섞이므로, 한 스레드에서 학생들을 한 단계씩 번갈아 진행합니다.
+# (백그라운드 작업과 가짜 서버는 그대로 동시에 돌아가므로 캐시 공유·single-flight 효과는 측정됩니다)
+# 로그인 → 미션 로드 → 단어 탭 → 문장 연습(tab3) → 실전 테스트(tab4) → 학습 종료까지 진행하고
+# 단계별 재실행 지연, 세션당 외부 호출 수, 세션당 메모리를 출력합니다.
+#
+# 사용 예: python bench/run_bench.py --students 20 --concurrency 5 --latency 0.2 --error-rate 0.02
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_services import FakeGemini, FakeOpenAI, FakeSupabase
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+TAB_WORDS, TAB_PRACTICE, TAB_QUIZ = "🍎 오늘의 단어", "✍️ 문장 연습", "⚔️ 실전 테스트"
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="가짜 외부 서비스로 app.py 부하 테스트")
+    p.add_argument("--students", type=int, default=10, help="시뮬레이션할 학생 수")
+    p.add_argument("--concurrency", type=int, default=4, help="동시에 진행하는 학생 수")
+    p.add_argument("--latency", type=float, default=0.05, help="모든 가짜 서버의 기본 응답 지연(초)")
+    p.add_argument("--gemini-latency", type=float, help="Gemini만 따로 지정하는 지연(초)")
+    p.add_argument("--openai-latency", type=float, help="OpenAI만 따로 지정하는 지연(초)")
+    p.add_argument("--supabase-latency", type=float, help="Supabase만 따로 지정하는 지연(초)")
+    p.add_argument("--jitter", type=float, default=0.0, help="지연에 더할 ±지터(초)")
+    p.add_argument("--error-rate", type=float, default=0.0, help="503을 돌려줄 요청 비율(0~1)")
+    p.add_argument("--practice", type=int, default=4, help="학생당 제출할 연습 문장 수")
+    p.add_argument("--wrong-rate", type=float, default=0.2, help="퀴즈에서 일부러 틀릴 비율")
+    p.add_argument("--warm", action="store_true", help="측정 전에 학생 한 명을 먼저 돌려 캐시를 데움 (메모리 측정에서 첫 import 비용도 빠짐)")
+    p.add_argument("--cache-dir", help="디스크 캐시 폴더(기본: 매번 새 임시 폴더)")
+    p.add_argument("--content-dir", help="콘텐츠 팩 폴더(기본: 팩 없이 실시간 생성만 측정)")
+    p.add_argument("--no-tracemalloc", action="store_true", help="메모리 측정을 끄고 지연만 측정")
+    p.add_argument("--timeout", type=float, default=60.0, help="한 번의 재실행/대기 제한 시간(초)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--json", help="결과를 JSON 파일로도 저장")
+    return p.parse_args()
+
+
+class Student:
+    # AppTest 하나 = 브라우저 탭 하나. 재실행마다 걸린 시간을 단계 이름별로 모읍니다.
+    def __init__(self, user_id, secrets, args, rng):
+        from streamlit.testing.v1 import AppTest
+        self.user_id = user_id
+        self.args = args
+        self.rng = rng
+        self.tab = None
+        self.timings = defaultdict(list)
+        self.at = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+        for k, v in secrets.items():
+            self.at.secrets[k] = v
+
+    def run(self, step):
+        at = self.at
+        at.session_state["user_id"] = self.user_id
+        # AppTest는 지연 탭 선택을 기억하지 못하므로 매번 다시 지정
+        if self.tab:
+            at.session_state["active_tab"] = self.tab
+        t = time.perf_counter()
+        at.run()
+        self.timings[step].append((time.perf_counter() - t) * 1000)
+        if at.exception:
+            raise RuntimeError(f"{step}: {at.exception[0].message}")
+
+    def button(self, label, last=False):
+        found = [b for b in self.at.button if b.label == label]
+        if not found:
+            raise RuntimeError(f"'{label}' 버튼이 없습니다")
+        return found[-1] if last else found[0]
+
+    # 조건이 될 때까지 차례를 넘기다가(False) 한 번 재실행(True)
+    def wait(self, step, done):
+        deadline = time.monotonic() + self.args.timeout
+        while not done():
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{step}: 제한 시간 초과")
+            yield False
+        self.run(step)
+        yield True
+
+    def jobs_done(self):
+        return all(f.done() for f in self.at.session_state["jobs"].values())
+
+    def play(self):
+        at = self.at
+        self.run("login")
+        yield True
+        if "mission" not in at.session_state:
+            raise RuntimeError(f"미션이 없습니다 (레벨: {at.session_state['user_info'].get('current_level')})")
+        yield from self.wait("mission_stream", lambda: not at.session_state["mission"].get("_streaming"))
+
+        self.tab = TAB_WORDS
+        self.run("words_tab")
+        yield True
+
+        self.tab = TAB_PRACTICE
+        self.run("practice_tab")
+        yield True
+        sentences = at.session_state["mission"]["practice_sentences"]
+        for k in range(min(self.args.practice, len(sentences))):
+            answer = sentences[k]["en"]
+            # 정답 / 대소문자·마침표 차이(로컬 채점) / 문법 오류(모델 채점)를 번갈아 제출
+            answer = [answer, answer.lower().rstrip("."), answer.replace(" am ", " is ", 1) + " x"][k % 3]
+            at.text_input(key=f"input_{k}").input(answer)
+            [b for b in at.button if b.label == "제출"][k].click()
+            self.run("practice_submit")
+            yield True
+        yield from self.wait("practice_grade", self.jobs_done)
+
+        self.tab = TAB_QUIZ
+        self.run("quiz_tab")
+        yield True
+        self.button("🚀 실전 테스트 시작").click()
+        self.run("quiz_start")
+        yield True
+        for _ in range(200):
+            qs = at.session_state["quiz_state"]
+            if qs["phase"] == "end":
+                break
+            target = qs["shuffled_words"][qs["current_idx"]]
+            wrong = self.rng.random() < self.args.wrong_rate
+            if qs["phase"] == "mc":
+                choice = [o for o in at.radio[0].options if (o == target["ko"]) != wrong][0]
+                at.radio[0].set_value(choice)
+                self.button("확인").click()
+                self.run("quiz_mc")
+                yield True
+            else:
+                box = [t for t in at.text_input if t.label == "영어 단어 입력"][0]
+                box.input(target["en"] + ("x" if wrong else ""))
+                self.button("제출", last=True).click()
+                self.run("quiz_write")
+                yield True
+        else:
+            raise RuntimeError("퀴즈가 끝나지 않습니다")
+        self.button("학습 종료").click()
+        self.run("finish")
+        yield True
+
+
+def seed_users(supabase, user_ids):
+    today = date.today().isoformat()
+    for uid in user_ids:
+        supabase.rpc_login_and_touch_attendance(uid, today)
+        supabase._user(uid)["current_level"] = "Mid"
+
+
+def run_students(user_ids, secrets, args, seed):
+    # 동시에 최대 concurrency명이 접속해 있고, 한 명이 끝나면 다음 학생이 들어옵니다
+    pending = list(enumerate(user_ids))
+    active, results = [], []
+    while pending or active:
+        while pending and len(active) < args.concurrency:
+            i, uid = pending.pop(0)
+            student = Student(uid, secrets, args, random.Random(seed + i))
+            active.append((student, student.play(), time.perf_counter()))
+        progressed = False
+        for item in list(active):
+            student, steps, t = item
+            try:
+                progressed |= next(steps)
+                continue
+            except StopIteration:
+                error = None
+            except Exception as e:
+                error = f"{student.user_id}: {e}"
+            active.remove(item)
+            results.append((student, (time.perf_counter() - t) * 1000, error))
+        if not progressed:
+            time.sleep(0.02)
+    return results
+
+
+def pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))] if values else 0.0
+
+
+def main():
+    args = parse_args()
+    logging.disable(logging.WARNING)
+    rng = random.Random(args.seed)
+    common = dict(jitter=args.jitter, error_rate=args.error_rate)
+    services = {
+        "gemini": FakeGemini(latency=args.gemini_latency if args.gemini_latency is not None else args.latency, seed=rng.random(), **common),
+        "openai": FakeOpenAI(latency=args.openai_latency if args.openai_latency is not None else args.latency, seed=rng.random(), **common),
+        "supabase": FakeSupabase(latency=args.supabase_latency if args.supabase_latency is not None else args.latency, seed=rng.random(), **common),
+    }
+    for s in services.values():
+        s.start()
+    cache_dir = args.cache_dir or tempfile.mkdtemp(prefix="sparta-bench-")
+    secrets = {
+        "OPENAI_API_KEY": "sk-bench", "SUPABASE_URL": services["supabase"].url, "SUPABASE_KEY": "bench",
+        "GOOGLE_API_KEY": "bench", "GEMINI_BASE_URL": services["gemini"].url,
+        "OPENAI_BASE_URL": services["openai"].url + "/v1", "CACHE_DIR": cache_dir,
+        "CONTENT_DIR": args.content_dir or os.path.join(cache_dir, "no-content"),
+    }
+    user_ids = [f"bench{i:03d}" for i in range(args.students)]
+    seed_users(services["supabase"], user_ids + ["warmup"])
+
+    try:
+        if args.warm:
+            [(_, _, error)] = run_students(["warmup"], secrets, args, args.seed)
+            if error:
+                print("워밍업 실패:", error)
+            for s in services.values():
+                with s.lock:
+                    s.calls.clear()
+
+        if not args.no_tracemalloc:
+            tracemalloc.start()
+        mem_before = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        t0 = time.perf_counter()
+        results = run_students(user_ids, secrets, args, args.seed + 1)
+        wall = time.perf_counter() - t0
+        # 학생들의 AppTest(세션 상태)를 아직 붙잡고 있는 상태에서 측정
+        mem_after, mem_peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        tracemalloc.stop()
+    finally:
+        for s in services.values():
+            s.stop()
+
+    timings = defaultdict(list)
+    for student, _, _ in results:
+        for step, values in student.timings.items():
+            timings[step].extend(values)
+    errors = [e for _, _, e in results if e]
+    n = len(results)
+    session_ms = [ms for _, ms, e in results if not e]
+    all_runs = [v for values in timings.values() for v in values]
+
+    report = {
+        "students": n, "failed": len(errors), "wall_s": round(wall, 2),
+        "session_ms": {"p50": round(pct(session_ms, 50)), "p95": round(pct(session_ms, 95))},
+        "rerun_ms": {"count": len(all_runs), "p50": round(pct(all_runs, 50), 1), "p95": round(pct(all_runs, 95), 1)},
+        "steps": {step: {"count": len(v), "p50": round(pct(v, 50), 1), "p95": round(pct(v, 95), 1), "max": round(max(v), 1)}
+                  for step, v in timings.items()},
+        "calls_per_session": {name: {route: round(c / n, 2) for route, c in sorted(s.calls.items())} for name, s in services.items()},
+        "calls_total": {name: s.total_calls() for name, s in services.items()},
+        "memory_per_session_kb": round((mem_after - mem_before) / n / 1024, 1) if mem_after else None,
+        "memory_peak_mb": round(mem_peak / 2**20, 1) if mem_peak else None,
+        "errors": errors,
+    }
+    print(f"학생 {n}명 (동시 {args.concurrency}) | 실패 {len(errors)} | 총 {report['wall_s']}s | "
+          f"세션 p50 {report['session_ms']['p50']}ms p95 {report['session_ms']['p95']}ms")
+    print(f"\n{'단계':<16}{'횟수':>6}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for step, st_ in report["steps"].items():
+        print(f"{step:<16}{st_['count']:>6}{st_['p50']:>10}{st_['p95']:>10}{st_['max']:>10}")
+    print(f"{'(전체)':<16}{len(all_runs):>6}{report['rerun_ms']['p50']:>10}{report['rerun_ms']['p95']:>10}")
+    print("\n세션당 외부 호출 (가짜 서버 기준)")
+    for name, routes in report["calls_per_session"].items():
+        print(f"  {name:<9} 합계 {report['calls_total'][name] / n:.2f}  " + ", ".join(f"{r}={c}" for r, c in routes.items()))
+    if report["memory_per_session_kb"] is not None:
+        print(f"\n세션당 메모리 {report['memory_per_session_kb']} KB | 최대 추적 메모리 {report['memory_peak_mb']} MB")
+    for e in errors[:10]:
+        print("오류:", e)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if not args.cache_dir:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+# 콘텐츠 팩: 미리 생성한 미션 JSON과 TTS 음성을 한 파일에 모은 읽기 전용 바이너리
+#
+# 앱은 팩을 mmap으로 열어 인덱스를 이진 탐색하고, 내용은 복사 없이 memoryview로 돌려줍니다.
+# 팩에 없는 (레벨, 문법, 요일) 미션이나 문장만 기존처럼 실시간으로 생성합니다.
+#
+# 파일 구조 (리틀 엔디언)
+#   헤더 32B : 매직 b"SPCK", 형식 버전(u16), 예비(u16), 항목 수(u32), 인덱스 위치(u64), 메타 위치(u64), 메타 길이(u32)
+#   데이터   : 내용 blob을 이어 붙임 (내용이 같은 blob은 한 번만 저장)
+#   메타     : 빌드 정보 JSON (커리큘럼 버전, TTS 모델/목소리, 빌드 시각, 항목 수)
+#   인덱스   : (키 32B, 위치 u64, 길이 u32, 종류 u8, 패딩 3B) × 항목 수, 키 순으로 정렬
+#   키는 BlobStore와 같은 sha256 이므로 디스크 캐시와 팩이 같은 키로 찾습니다.
+#
+# 빌드: python content_pack.py --out content/sparta-v1.pack
+#   API 키는 환경 변수(GOOGLE_API_KEY, OPENAI_API_KEY) 또는 .streamlit/secrets.toml에서 읽습니다.
+import argparse
+import datetime
+import glob
+import hashlib
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from curriculum import (CURRICULUM_VERSION, GEMINI_MODELS, GRAMMAR_SYLLABUS, LEVELS, TOPICS_BY_DAY, TTS_MODEL, TTS_VOICE,
+                        curriculum_payload, is_valid_mission, mission_tts_texts)
+
+MAGIC = b"SPCK"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHIQQI")
+ENTRY = struct.Struct("<32sQIB3x")
+KIND_MISSION = 1
+KIND_AUDIO = 2
+
+
+def blob_key(*parts):
+    return hashlib.sha256("\0".join(map(str, parts)).encode("utf-8")).hexdigest()
+
+def mission_key(level, grammar_idx, weekday):
+    return blob_key(CURRICULUM_VERSION, level, grammar_idx, weekday)
+
+def audio_key(text):
+    return blob_key(TTS_MODEL, TTS_VOICE, text)
+
+
+class ContentPack:
+    # 팩 파일 하나: 인덱스도 mmap 위에서 바로 이진 탐색 (파일을 메모리로 읽어 들이지 않음)
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mm)
+        if len(self.mm) < HEADER.size: raise ValueError(f"{path}: 팩이 너무 짧습니다")
+        magic, version, _, self.count, self.index_at, meta_at, meta_len = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION: raise ValueError(f"{path}: 지원하지 않는 팩 형식")
+        if self.index_at + self.count * ENTRY.size > len(self.mm): raise ValueError(f"{path}: 인덱스가 잘렸습니다")
+        self.meta = json.loads(str(self.view[meta_at:meta_at + meta_len], "utf-8"))
+
+    def _entry(self, i):
+        return ENTRY.unpack_from(self.mm, self.index_at + i * ENTRY.size)
+
+    def get(self, k):
+        key = bytes.fromhex(k); lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            at = self.index_at + mid * ENTRY.size
+            probe = self.mm[at:at + 32]
+            if probe < key: lo = mid + 1
+            elif probe > key: hi = mid
+            else:
+                _, offset, length, _ = self._entry(mid)
+                return self.view[offset:offset + length]
+        return None
+
+    def close(self):
+        # 아직 쓰는 memoryview가 있으면 닫지 않고 GC에 맡김
+        try: self.view.release(); self.mm.close()
+        except BufferError: pass
+
+    def items(self):
+        for i in range(self.count):
+            key, offset, length, kind = self._entry(i)
+            yield key.hex(), kind, self.view[offset:offset + length]
+
+
+class ContentPacks:
+    # 폴더 안의 모든 팩 (최근에 만든 팩부터 찾음). 팩이 없거나 깨져 있으면 그냥 비어 있는 것으로 취급
+    def __init__(self, directory):
+        self.packs = []
+        for path in sorted(glob.glob(os.path.join(directory, "*.pack")), key=os.path.getmtime, reverse=True):
+            try: self.packs.append(ContentPack(path))
+            except (OSError, ValueError): pass
+
+    def __len__(self): return len(self.packs)
+
+    def get(self, k):
+        for pack in self.packs:
+            data = pack.get(k)
+            if data is not None: return data
+        return None
+
+
+class PackWriter:
+    # 임시 파일에 blob을 순서대로 쓰고, 닫을 때 메타/인덱스/헤더를 채운 뒤 원자적으로 교체
+    def __init__(self, path, meta):
+        self.path = path; self.meta = meta
+        self.tmp = f"{path}.{os.getpid()}.tmp"
+        self.f = open(self.tmp, "wb"); self.f.write(b"\0" * HEADER.size)
+        self.entries = {}; self.blobs = {}; self.lock = threading.Lock()
+
+    def add(self, k, kind, data):
+        digest = hashlib.sha256(data).digest()
+        with self.lock:
+            if digest not in self.blobs:
+                self.blobs[digest] = (self.f.tell(), len(data)); self.f.write(data)
+            self.entries[bytes.fromhex(k)] = (*self.blobs[digest], kind)
+
+    def close(self):
+        meta = json.dumps({**self.meta, "entries": len(self.entries), "blobs": len(self.blobs)}, ensure_ascii=False).encode("utf-8")
+        meta_at = self.f.tell(); self.f.write(meta)
+        index_at = self.f.tell()
+        for key in sorted(self.entries):
+            self.f.write(ENTRY.pack(key, *self.entries[key]))
+        self.f.seek(0); self.f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(self.entries), index_at, meta_at, len(meta)))
+        self.f.flush(); os.fsync(self.f.fileno()); self.f.close()
+        os.replace(self.tmp, self.path)
+
+
+# ==========================================
+# 팩 빌드 (CLI)
+# ==========================================
+def load_secrets():
+    secrets = {}
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".streamlit", "secrets.toml")
+    try:
+        import tomllib
+        with open(path, "rb") as f: secrets = tomllib.load(f)
+    except (ImportError, OSError): pass
+    return {k: os.environ.get(k, secrets.get(k)) for k in ("GOOGLE_API_KEY", "OPENAI_API_KEY", "GEMINI_BASE_URL", "OPENAI_BASE_URL")}
+
+
+def mission_problems(m):
+    # 앱의 스키마 검사보다 엄격한 빌드용 검사: 팩에 들어간 미션은 다시 검증되지 않음
+    if not is_valid_mission(m): return ["스키마 불일치"]
+    problems = []
+    if len(m["words"]) < 20: problems.append(f"단어 {len(m['words'])}개")
+    if len(m["practice_sentences"]) < 20: problems.append(f"예문 {len(m['practice_sentences'])}개")
+    if len({w["en"].strip().lower() for w in m["words"]}) != len(m["words"]): problems.append("중복 단어")
+    texts = [w["en"] for w in m["words"]] + [w["ko"] for w in m["words"]] + [q["en"] for q in m["practice_sentences"]] + [q["ko"] for q in m["practice_sentences"]]
+    if not all(isinstance(t, str) and t.strip() for t in texts): problems.append("빈 문자열")
+    if any(len(q["en"].split()) > 12 for q in m["practice_sentences"]): problems.append("너무 긴 예문")
+    return problems
+
+
+class Builder:
+    def __init__(self, args, secrets):
+        import requests
+        self.args = args; self.secrets = secrets
+        self.http = requests.Session()
+        self.gemini_base_url = secrets["GEMINI_BASE_URL"] or "https://generativelanguage.googleapis.com"
+        self.openai = None
+        if not args.no_audio:
+            from openai import OpenAI
+            self.openai = OpenAI(api_key=secrets["OPENAI_API_KEY"], base_url=secrets["OPENAI_BASE_URL"], max_retries=3)
+
+    def generate_mission(self, grammar_idx, weekday):
+        # 앱과 같은 프롬프트로 모델 후보를 차례로 시도하고, 검증을 통과할 때까지 재시도
+        payload = curriculum_payload(grammar_idx, weekday); errors = []
+        for attempt in range(self.args.attempts):
+            for model_name in GEMINI_MODELS:
+                url = f"{self.gemini_base_url}/v1beta/models/{model_name}:generateContent?key={self.secrets['GOOGLE_API_KEY']}"
+                try:
+                    response = self.http.post(url, json=payload, timeout=(5, 120))
+                    if response.status_code != 200:
+                        errors.append(f"{model_name}: {response.status_code}"); continue
+                    m = json.loads(response.json()['candidates'][0]['content']['parts'][0]['text'])
+                except Exception as e:
+                    errors.append(f"{model_name}: {e}"); continue
+                problems = mission_problems(m)
+                if not problems: return m
+                errors.append(f"{model_name}: {', '.join(problems)}")
+            time.sleep(min(8.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.5))
+        raise RuntimeError(" / ".join(errors[-3:]))
+
+    def synthesize(self, text):
+        return self.openai.audio.speech.create(model=TTS_MODEL, voice=TTS_VOICE, input=text).content
+
+
+def build(args):
+    secrets = load_secrets()
+    if not secrets["GOOGLE_API_KEY"] or (not args.no_audio and not secrets["OPENAI_API_KEY"]):
+        sys.exit("GOOGLE_API_KEY / OPENAI_API_KEY가 필요합니다 (환경 변수 또는 .streamlit/secrets.toml)")
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    reuse = ContentPacks(os.path.dirname(os.path.abspath(args.out)))
+    if args.fresh: reuse.packs = []
+    builder = Builder(args, secrets)
+    writer = PackWriter(args.out, {
+        "curriculum_version": CURRICULUM_VERSION, "tts_model": TTS_MODEL, "tts_voice": TTS_VOICE,
+        "levels": args.levels, "built_at": datetime.datetime.now().isoformat(timespec="seconds"),
+    })
+    combos = [(g, d) for g in args.grammar for d in args.days]
+    failed = []; stats = {"mission_reused": 0, "mission_generated": 0, "audio_reused": 0, "audio_generated": 0}
+
+    def mission_job(g, d):
+        # 프롬프트에 레벨이 들어가지 않으므로 (문법, 요일)마다 한 번 생성해서 모든 레벨 키에 연결
+        for level in args.levels:
+            data = reuse.get(mission_key(level, g, d))
+            m = json.loads(str(data, "utf-8")) if data is not None else None
+            if m is not None and not mission_problems(m): return m, True
+        return builder.generate_mission(g, d), False
+
+    missions = []
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(mission_job, g, d): (g, d) for g, d in combos}
+        for fut in as_completed(futures):
+            g, d = futures[fut]
+            try: m, reused = fut.result()
+            except Exception as e:
+                failed.append(f"문법 {g} / {TOPICS_BY_DAY[d]}: {e}"); print(f"  ✗ 문법 {g:2d} {TOPICS_BY_DAY[d]}: {e}"); continue
+            stats["mission_reused" if reused else "mission_generated"] += 1
+            data = json.dumps(m, ensure_ascii=False).encode("utf-8")
+            for level in args.levels: writer.add(mission_key(level, g, d), KIND_MISSION, data)
+            missions.append(m)
+            print(f"  ✓ 문법 {g:2d} {TOPICS_BY_DAY[d]:<18} {'재사용' if reused else '생성'}")
+
+        if not args.no_audio:
+            texts = list(dict.fromkeys(t for m in missions for t in mission_tts_texts(m)))
+            print(f"음성 {len(texts)}개")
+            def audio_job(text):
+                data = reuse.get(audio_key(text))
+                if data is not None: return bytes(data), True
+                return builder.synthesize(text), False
+            futures = {pool.submit(audio_job, t): t for t in texts}
+            for i, fut in enumerate(as_completed(futures), 1):
+                text = futures[fut]
+                try: data, reused = fut.result()
+                except Exception as e:
+                    failed.append(f"음성 {text[:30]!r}: {e}"); continue
+                stats["audio_reused" if reused else "audio_generated"] += 1
+                writer.add(audio_key(text), KIND_AUDIO, data)
+                if i % 200 == 0: print(f"  {i}/{len(texts)}")
+
+    # 같은 경로의 이전 팩에서 이번에 다루지 않은 항목은 그대로 옮겨 담음 (일부 문법/요일만 다시 빌드하는 경우)
+    carried = 0
+    for pack in reuse.packs:
+        if os.path.abspath(pack.path) != os.path.abspath(args.out): continue
+        for k, kind, data in pack.items():
+            if bytes.fromhex(k) not in writer.entries: writer.add(k, kind, data); carried += 1
+    stats["carried_over"] = carried
+    # Windows에서는 열려 있는 파일을 교체할 수 없으므로 이전 팩을 먼저 닫음 (마지막 memoryview도 놓아야 닫힘)
+    data = None
+    for pack in reuse.packs: pack.close()
+    writer.close()
+    size = os.path.getsize(args.out)
+    print(f"\n{args.out}: 항목 {len(writer.entries)}개, blob {len(writer.blobs)}개, {size / 2**20:.1f}MB")
+    print(", ".join(f"{k}={v}" for k, v in stats.items()))
+    if failed:
+        print(f"실패 {len(failed)}건 (앱에서 실시간 생성으로 대체됨):")
+        for line in failed[:20]: print("  " + line)
+    return 1 if failed else 0
+
+
+def main():
+    p = argparse.ArgumentParser(description="모든 (레벨, 문법, 요일) 미션과 음성을 미리 만들어 콘텐츠 팩으로 저장")
+    p.add_argument("--out", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "content", f"sparta-v{CURRICULUM_VERSION}.pack"))
+    p.add_argument("--levels", nargs="+", default=LEVELS)
+    p.add_argument("--grammar", nargs="+", type=int, default=list(range(len(GRAMMAR_SYLLABUS))), help="문법 번호 (0부터)")
+    p.add_argument("--days", nargs="+", type=int, default=list(range(len(TOPICS_BY_DAY))), help="요일 번호 (월=0)")
+    p.add_argument("--workers", type=int, default=8)
+    p.add_argument("--attempts", type=int, default=3, help="미션 하나당 검증 실패 시 재시도 횟수")
+    p.add_argument("--no-audio", action="store_true", help="미션만 만들고 음성은 생략")
+    p.add_argument("--fresh", action="store_true", help="같은 폴더의 기존 팩을 재사용하지 않고 모두 새로 생성")
+    p.add_argument("--inspect", metavar="PACK", help="팩의 메타 정보와 항목 수만 출력")
+    args = p.parse_args()
+    if args.inspect:
+        pack = ContentPack(args.inspect)
+        kinds = {KIND_MISSION: 0, KIND_AUDIO: 0}
+        for _, kind, _ in pack.items(): kinds[kind] = kinds.get(kind, 0) + 1
+        print(json.dumps({**pack.meta, "missions": kinds[KIND_MISSION], "audio": kinds[KIND_AUDIO]}, ensure_ascii=False, indent=2))
+        return 0
+    return build(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+# 커리큘럼 정의: 앱(app.py)과 콘텐츠 팩 빌더(content_pack.py)가 함께 쓰는 문법 순서, 요일 주제, 프롬프트
+# Streamlit 없이도 import할 수 있어야 하므로 여기에는 순수 파이썬만 둡니다.
+import json
+import re
+
+CURRICULUM_VERSION = 1  # 프롬프트를 수정하면 올려서 기존 커리큘럼 캐시/콘텐츠 팩을 무효화
+LEVELS = ["Low", "Mid", "High"]  # 레벨 테스트 결과 (프롬프트에는 들어가지 않지만 캐시 키에는 포함)
+TTS_MODEL = "tts-1"
+TTS_VOICE = "alloy"
+GEMINI_MODELS = ["gemini-flash-latest", "gemini-pro-latest", "gemini-2.0-flash-exp"]
+
+GRAMMAR_SYLLABUS = [
+    "Be동사의 현재형 (am, are, is)", "일반동사의 현재형 (3인칭 단수 s/es)", "명사와 관사 (a/an, the, 복수형 s)",
+    "대명사 (주격, 소유격, 목적격)", "형용사와 부사의 역할", "Be동사의 부정문과 의문문",
+    "일반동사의 부정문과 의문문 (do/does)", "진행형 시제 (be + v-ing)", "미래 시제 (will, be going to)",
+    "조동사 1 (can, may)", "조동사 2 (must, should, have to)", "의문사 의문문 (Who, What, Where...)",
+    "과거 시제 (Be동사 was/were)", "과거 시제 (일반동사 규칙 -ed)", "과거 시제 (일반동사 불규칙)",
+    "To 부정사의 명사적 용법", "동명사 (v-ing)", "명령문과 제안문 (Let's)", "전치사 (시간: at, on, in)", "전치사 (장소: at, on, in)"
+]
+
+TOPICS_BY_DAY = ["School Life", "Hobbies", "Nature & Animals", "Food & Cooking", "Travel", "Health & Feelings", "My Dream Job"]
+
+
+def build_curriculum_prompt(today_grammar, today_topic_hint):
+    return f"""
+    You are an expert English Curriculum Designer for Korean Middle School Grade 1.
+
+    **CRITICAL INSTRUCTION - SENTENCE GENERATION:**
+    1. **NO DECORATIVE ADJECTIVES:** Do NOT add words like 'big', 'fast', 'happy', 'new' unless absolutely necessary for the grammar rule.
+       - ❌ Bad: "Dad drives a big truck." (Where did 'big' come from?)
+       - ✅ Good: "Dad drives a truck."
+    2. **1:1 Match:** The Korean translation MUST match the English sentence exactly word-for-word.
+    3. **Target Grammar:** Use **"{today_grammar}"**.
+    4. **Simplicity:** Keep sentences under 8 words.
+
+    **CONTENT GUIDELINES:**
+    1. **Target:** CEFR A2-B1 (Middle School).
+    2. **Mix:** 30% Easy, 50% Medium (Core), 20% Challenge.
+    3. **Topic:** {today_topic_hint}.
+
+    Output JSON Schema:
+    {{
+        "topic": "Topic Name ({today_topic_hint})",
+        "grammar": {{ "title": "{today_grammar}", "description": "Easy Korean Explanation", "rule": "English Rule", "example": "English Example" }},
+        "words": [{{ "en": "...", "ko": "..." }}],
+        "practice_sentences": [
+            {{
+                "ko": "Korean Translation",
+                "en": "English Sentence (No hidden adjectives)",
+                "hint_structure": "Subject + Verb + Object",
+                "hint_grammar": "Korean Tip"
+            }}
+        ]
+    }}
+    Create exactly 20 words and 20 sentences.
+    """
+
+
+def normalize_level(text):
+    # 레벨 테스트 모델의 자유 응답("The student's level is Mid.")에서 LEVELS 값 하나를 골라냄 (없으면 중간 레벨)
+    if text is None: return None
+    found = re.search(r"\b(" + "|".join(LEVELS) + r")\b", str(text), re.IGNORECASE)
+    return next(l for l in LEVELS if l.lower() == found.group(1).lower()) if found else LEVELS[len(LEVELS) // 2]
+
+
+def curriculum_payload(grammar_idx, weekday):
+    # Gemini generateContent / streamGenerateContent 요청 본문
+    prompt_text = build_curriculum_prompt(GRAMMAR_SYLLABUS[grammar_idx], TOPICS_BY_DAY[weekday])
+    return {"contents": [{"parts": [{"text": prompt_text}]}], "generationConfig": {"response_mime_type": "application/json"}}
+
+
+def is_valid_mission(m):
+    def rows(key, fields):
+        items = m.get(key)
+        return isinstance(items, list) and len(items) >= 4 and all(isinstance(x, dict) and all(f in x for f in fields) for x in items)
+    return (isinstance(m, dict) and isinstance(m.get("topic"), str)
+            and isinstance(m.get("grammar"), dict) and all(f in m["grammar"] for f in ("title", "description", "example"))
+            and rows("words", ("en", "ko")) and rows("practice_sentences", ("en", "ko")))
+
+
+def grammar_tts_text(gr):
+    return f"오늘의 문법은 {gr['title']}입니다. {gr['description']} 예를 들어 {gr['example']} 처럼 씁니다."
+
+
+def mission_tts_texts(m):
+    # 미션 하나에서 음성으로 들려줄 수 있는 모든 문장 (단어, 문법 설명, 연습 문장)
+    return list(dict.fromkeys([w["en"] for w in m["words"]] + [grammar_tts_text(m["grammar"])] + [q["en"] for q in m["practice_sentences"]]))
+
+
+class MissionStreamParser:
+    # 조각난 JSON을 이어 받으며 최상위 필드와 practice_sentences 항목이 완성되는 즉시 꺼내는 증분 파서
+    def __init__(self):
+        self.buf = ""; self.pos = 0; self.depth = 0
+        self.in_str = False; self.esc = False; self.str_start = None
+        self.key = None; self.expect_key = False; self.val_start = None; self.item_start = None
+
+    def feed(self, text):
+        self.buf += text; buf = self.buf; out = []
+        for i in range(self.pos, len(buf)):
+            c = buf[i]
+            if self.in_str:
+                if self.esc: self.esc = False
+                elif c == "\\": self.esc = True
+                elif c == '"':
+                    self.in_str = False
+                    if self.depth == 1 and self.expect_key:
+                        self.key = json.loads(buf[self.str_start:i + 1]); self.expect_key = False
+            elif c == '"':
+                self.in_str = True; self.str_start = i
+                if self.depth == 1 and not self.expect_key and self.val_start is None: self.val_start = i
+            elif c in "{[":
+                if self.depth == 1 and self.val_start is None: self.val_start = i
+                if self.depth == 2 and c == "{" and self.key == "practice_sentences": self.item_start = i
+                self.depth += 1
+                if self.depth == 1: self.expect_key = True
+            elif c in "}]":
+                self.depth -= 1
+                if self.depth == 2 and self.item_start is not None:
+                    out.append(("practice_sentences[]", json.loads(buf[self.item_start:i + 1]))); self.item_start = None
+                elif self.depth == 1 and self.val_start is not None:
+                    out.append((self.key, json.loads(buf[self.val_start:i + 1]))); self.val_start = None
+                elif self.depth == 0 and self.val_start is not None:
+                    out.append((self.key, json.loads(buf[self.val_start:i]))); self.val_start = None
+            elif c == "," and self.depth == 1:
+                if self.val_start is not None:
+                    out.append((self.key, json.loads(buf[self.val_start:i]))); self.val_start = None
+                self.expect_key = True
+            elif self.depth == 1 and not self.expect_key and self.val_start is None and c not in " \t\r\n:":
+                self.val_start = i
+        self.pos = len(buf)
+        return out
@@ -0,0 +1,35 @@
+# 로컬 채점: 정답 문장과 거의 같은 입력은 모델을 부르지 않고 바로 판정 (app.py에서 사용, Streamlit 없이 테스트 가능)
+import difflib
+import re
+
+# he's/it's/there's 같은 's는 is와 has 둘 다 될 수 있어서 펼치지 않음 → 다르면 모델이 채점
+CONTRACTIONS = {
+    "don't": "do not", "doesn't": "does not", "didn't": "did not", "isn't": "is not", "aren't": "are not",
+    "wasn't": "was not", "weren't": "were not", "can't": "can not", "cannot": "can not", "won't": "will not",
+    "shouldn't": "should not", "mustn't": "must not", "couldn't": "could not", "wouldn't": "would not",
+    "haven't": "have not", "hasn't": "has not", "i'm": "i am", "you're": "you are", "we're": "we are",
+    "they're": "they are",
+    "i'll": "i will", "you'll": "you will", "we'll": "we will", "they'll": "they will", "he'll": "he will",
+    "she'll": "she will", "it'll": "it will", "i've": "i have", "you've": "you have", "we've": "we have", "they've": "they have",
+}
+
+def normalize_sentence(text):
+    # 대소문자/문장부호/공백/축약형 차이를 없앤 단어 목록
+    text = text.lower().replace("’", "'").replace("‘", "'")
+    tokens = []
+    for tok in re.findall(r"[a-z0-9']+", text):
+        tok = tok.strip("'")
+        if tok: tokens.extend(CONTRACTIONS.get(tok, tok).split())
+    return tokens
+
+def grade_locally(target, user_input):
+    # 같은 문장이면 PASS, 단어 하나만 바뀌거나 빠지거나 더해졌으면 템플릿 피드백, 그 외는 None(모델에게 맡김)
+    want = normalize_sentence(target); got = normalize_sentence(user_input)
+    diffs = [op for op in difflib.SequenceMatcher(None, want, got, autojunk=False).get_opcodes() if op[0] != "equal"]
+    if not diffs: return "PASS"
+    if len(diffs) > 1: return None
+    tag, i1, i2, j1, j2 = diffs[0]
+    if tag == "replace" and i2 - i1 == 1 and j2 - j1 == 1: return f"FAIL '{got[j1]}' 대신 '{want[i1]}'을(를) 써야 해요."
+    if tag == "delete" and i2 - i1 == 1: return f"FAIL '{want[i1]}'이(가) 빠졌어요."
+    if tag == "insert" and j2 - j1 == 1: return f"FAIL '{got[j1]}'은(는) 필요 없는 단어예요."
+    return None
@@ -0,0 +1,25 @@
+-- 오답 단어 일괄 기록
+-- 퀴즈 단계가 끝날 때 세션에 모아둔 오답을 한 번의 RPC로 보내고, wrong_count는 서버에서 원자적으로 증가시킨다.
+
+-- unique 인덱스를 만들기 전에 기존 중복 행을 하나로 합침
+update wrong_words w set wrong_count = d.total
+from (select min(id) as id, sum(wrong_count) as total from wrong_words group by user_id, word having count(*) > 1) d
+where w.id = d.id;
+
+delete from wrong_words a using wrong_words b
+where a.user_id = b.user_id and a.word = b.word and a.id > b.id;
+
+create unique index if not exists wrong_words_user_word_idx on wrong_words (user_id, word);
+
+-- p_items: [{"word": "apple", "meaning": "사과", "misses": 2}, ...] (단어별로 합쳐서 전달)
+create or replace function record_wrong_words(p_user_id text, p_items jsonb)
+returns void
+language sql
+as $$
+  insert into wrong_words (user_id, word, meaning, wrong_count)
+  select p_user_id, item->>'word', item->>'meaning', (item->>'misses')::int
+  from jsonb_array_elements(p_items) as item
+  on conflict (user_id, word)
+  do update set wrong_count = wrong_words.wrong_count + excluded.wrong_count,
+                meaning = excluded.meaning;
+$$;
@@ -0,0 +1,51 @@
+-- 사용자/출석 저장소
+-- 로그인(없으면 생성) + 연속 학습 갱신, 학습 완료 기록을 각각 RPC 1회로 처리한다.
+
+-- unique 인덱스를 만들기 전에 중복 학생 행을 하나로 합침 (예전의 조회 후 insert 방식에서 생길 수 있었음)
+-- 누적 값은 가장 큰 것, 레벨/연속 학습은 가장 최근에 방문한 행의 값을 첫 행(ctid 최소)에 남기고 나머지는 삭제
+with merged as (
+  select user_id, min(ctid) as keep,
+         max(total_complete_count) as total_complete_count,
+         max(last_test_count) as last_test_count,
+         max(last_visit_date) as last_visit_date,
+         (array_agg(current_level order by last_visit_date desc nulls last) filter (where current_level is not null))[1] as current_level,
+         (array_agg(streak order by last_visit_date desc nulls last))[1] as streak
+  from users group by user_id having count(*) > 1
+), removed as (
+  delete from users a using users b
+  where a.user_id = b.user_id and a.ctid > b.ctid
+)
+update users u set total_complete_count = m.total_complete_count, last_test_count = m.last_test_count,
+                   last_visit_date = m.last_visit_date, current_level = m.current_level, streak = m.streak
+from merged m
+where u.ctid = m.keep;
+
+create unique index if not exists users_user_id_idx on users (user_id);
+
+-- 처음 온 학생은 streak 1로 생성, 어제 왔으면 +1, 오늘 이미 왔으면 유지, 그 외는 1로 초기화
+create or replace function login_and_touch_attendance(p_user_id text, p_today date)
+returns setof users
+language sql
+as $$
+  insert into users (user_id, current_level, total_complete_count, last_test_count, streak, last_visit_date)
+  values (p_user_id, null, 0, 0, 1, p_today)
+  on conflict (user_id) do update set
+    streak = case
+      when users.last_visit_date = p_today then users.streak
+      when users.last_visit_date = p_today - 1 then users.streak + 1
+      else 1
+    end,
+    last_visit_date = p_today
+  returning *;
+$$;
+
+-- 학습 로그 추가와 누적 완료 횟수 증가를 한 트랜잭션에서 처리하고 새 누적 횟수를 반환
+create or replace function complete_daily_mission(p_user_id text, p_study_date date)
+returns integer
+language sql
+as $$
+  insert into study_logs (user_id, study_date, completed_at) values (p_user_id, p_study_date, now());
+  update users set total_complete_count = coalesce(total_complete_count, 0) + 1
+  where user_id = p_user_id
+  returning total_complete_count;
+$$;
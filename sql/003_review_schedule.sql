@@ -0,0 +1,43 @@
+-- 오답 단어 복습 스케줄 (Leitner 5상자)
+-- 틀린 단어는 1상자(1일 뒤)로, 복습 때 맞히면 한 상자씩 올라가며 간격이 1 → 2 → 4 → 8 → 16일로 늘어난다.
+-- 오늘 복습할 단어는 (user_id, due_at) 인덱스 범위 조회 한 번으로 가져오고,
+-- 퀴즈 한 회차의 결과는 record_quiz_results RPC 1회로 기록한다.
+
+alter table wrong_words add column if not exists box smallint not null default 1;
+alter table wrong_words add column if not exists interval_days integer not null default 1;
+alter table wrong_words add column if not exists due_at timestamptz not null default now();  -- 기존 오답은 바로 복습 대상
+alter table wrong_words add column if not exists last_reviewed_at timestamptz;
+
+-- where user_id = ? and due_at <= ? order by due_at limit ? 를 인덱스만으로 처리
+create index if not exists wrong_words_user_due_idx on wrong_words (user_id, due_at) include (word, meaning, box);
+
+-- p_items: [{"word": "apple", "meaning": "사과", "misses": 0}, ...] (이번 회차에 나온 모든 단어, 단어별로 합쳐서 전달)
+-- misses > 0 : wrong_count 증가, 1상자로 되돌리고 내일 다시 복습
+-- misses = 0 : 복습 예정일이 지난 단어만 한 상자 올림 (처음 보는 단어를 맞힌 경우는 기록하지 않음)
+create or replace function record_quiz_results(p_user_id text, p_items jsonb, p_now timestamptz)
+returns void
+language sql
+as $$
+  update wrong_words w set
+    box = least(w.box + 1, 5),
+    interval_days = (2 ^ least(w.box, 4))::int,
+    due_at = p_now + make_interval(days => (2 ^ least(w.box, 4))::int),
+    last_reviewed_at = p_now
+  from jsonb_array_elements(p_items) as item
+  where w.user_id = p_user_id and w.word = item->>'word'
+    and (item->>'misses')::int = 0 and w.due_at <= p_now;
+
+  insert into wrong_words (user_id, word, meaning, wrong_count, box, interval_days, due_at, last_reviewed_at)
+  select p_user_id, item->>'word', item->>'meaning', (item->>'misses')::int, 1, 1, p_now + interval '1 day', p_now
+  from jsonb_array_elements(p_items) as item
+  where (item->>'misses')::int > 0
+  on conflict (user_id, word)
+  do update set wrong_count = wrong_words.wrong_count + excluded.wrong_count,
+                meaning = excluded.meaning,
+                box = 1, interval_days = 1,
+                due_at = excluded.due_at,
+                last_reviewed_at = excluded.last_reviewed_at;
+$$;
+
+-- 오답 기록은 record_quiz_results가 맡으므로 001의 record_wrong_words는 제거
+drop function if exists record_wrong_words(text, jsonb);
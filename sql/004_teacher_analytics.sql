@@ -0,0 +1,192 @@
+-- 교사용 통계
+-- 원본 행(study_logs, wrong_words)을 앱으로 가져오지 않고, 트리거가 쓰기 때마다 갱신하는 집계 테이블과
+-- 요약 행만 돌려주는 RPC로 대시보드를 구성한다. 목록은 keyset 페이지네이션(마지막 행 기준)으로 나눠 받는다.
+
+-- ------------------------------------------
+-- 오답 단어에 문법 단원 번호 기록 (record_quiz_results가 채움, 복습 단어는 기존 값 유지)
+-- ------------------------------------------
+alter table wrong_words add column if not exists grammar_idx smallint;
+
+create index if not exists study_logs_user_date_idx on study_logs (user_id, study_date);
+
+-- ------------------------------------------
+-- 집계 테이블
+-- ------------------------------------------
+-- 날짜별 출석 학생 수 / 학습 완료 학생 수
+create table if not exists daily_activity_rollup (
+  day date primary key,
+  visitors integer not null default 0,
+  completers integer not null default 0
+);
+
+-- 문법 단원별 많이 틀린 단어 (grammar_idx -1 = 단원 정보 없음)
+create table if not exists missed_word_rollup (
+  grammar_idx smallint not null,
+  word text not null,
+  meaning text,
+  misses integer not null default 0,
+  students integer not null default 0,
+  primary key (grammar_idx, word)
+);
+create index if not exists missed_word_rollup_rank_idx on missed_word_rollup (grammar_idx, misses desc, word);
+
+-- ------------------------------------------
+-- 증분 갱신 트리거
+-- ------------------------------------------
+-- 하루 첫 방문(가입 포함)마다 visitors +1
+create or replace function rollup_user_visit() returns trigger
+language plpgsql
+as $$
+begin
+  if new.last_visit_date is not null and (tg_op = 'INSERT' or new.last_visit_date is distinct from old.last_visit_date) then
+    insert into daily_activity_rollup (day, visitors) values (new.last_visit_date, 1)
+    on conflict (day) do update set visitors = daily_activity_rollup.visitors + 1;
+  end if;
+  return new;
+end;
+$$;
+
+drop trigger if exists users_visit_rollup on users;
+create trigger users_visit_rollup after insert or update of last_visit_date on users
+for each row execute function rollup_user_visit();
+
+-- 그날 그 학생의 첫 학습 완료만 completers +1
+create or replace function rollup_study_log() returns trigger
+language plpgsql
+as $$
+begin
+  if not exists (select 1 from study_logs s where s.user_id = new.user_id and s.study_date = new.study_date and s.id <> new.id) then
+    insert into daily_activity_rollup (day, completers) values (new.study_date, 1)
+    on conflict (day) do update set completers = daily_activity_rollup.completers + 1;
+  end if;
+  return new;
+end;
+$$;
+
+drop trigger if exists study_logs_rollup on study_logs;
+create trigger study_logs_rollup after insert on study_logs
+for each row execute function rollup_study_log();
+
+-- wrong_count 증가분만큼 misses, 학생별 첫 오답이면 students +1
+create or replace function rollup_wrong_word() returns trigger
+language plpgsql
+as $$
+declare
+  delta integer := new.wrong_count - case when tg_op = 'INSERT' then 0 else old.wrong_count end;
+begin
+  if delta > 0 then
+    insert into missed_word_rollup (grammar_idx, word, meaning, misses, students)
+    values (coalesce(new.grammar_idx, -1), new.word, new.meaning, delta, case when tg_op = 'INSERT' then 1 else 0 end)
+    on conflict (grammar_idx, word) do update set
+      misses = missed_word_rollup.misses + excluded.misses,
+      students = missed_word_rollup.students + excluded.students,
+      meaning = excluded.meaning;
+  end if;
+  return new;
+end;
+$$;
+
+drop trigger if exists wrong_words_rollup on wrong_words;
+create trigger wrong_words_rollup after insert or update of wrong_count on wrong_words
+for each row execute function rollup_wrong_word();
+
+-- ------------------------------------------
+-- 기존 데이터로 한 번 채우기 (방문 기록은 남아 있지 않으므로 과거 날짜는 완료 학생 수를 방문 수로 사용)
+-- ------------------------------------------
+insert into daily_activity_rollup (day, visitors, completers)
+select study_date, count(distinct user_id), count(distinct user_id) from study_logs group by study_date
+on conflict (day) do nothing;
+
+insert into missed_word_rollup (grammar_idx, word, meaning, misses, students)
+select coalesce(grammar_idx, -1), word, max(meaning), sum(wrong_count), count(*) from wrong_words group by coalesce(grammar_idx, -1), word
+on conflict (grammar_idx, word) do nothing;
+
+-- ------------------------------------------
+-- 퀴즈 결과 기록: 003 버전에 grammar_idx 기록 추가
+-- p_items: [{"word": "apple", "meaning": "사과", "misses": 0, "grammar_idx": 3}, ...]
+-- ------------------------------------------
+create or replace function record_quiz_results(p_user_id text, p_items jsonb, p_now timestamptz)
+returns void
+language sql
+as $$
+  update wrong_words w set
+    box = least(w.box + 1, 5),
+    interval_days = (2 ^ least(w.box, 4))::int,
+    due_at = p_now + make_interval(days => (2 ^ least(w.box, 4))::int),
+    last_reviewed_at = p_now
+  from jsonb_array_elements(p_items) as item
+  where w.user_id = p_user_id and w.word = item->>'word'
+    and (item->>'misses')::int = 0 and w.due_at <= p_now;
+
+  insert into wrong_words (user_id, word, meaning, wrong_count, box, interval_days, due_at, last_reviewed_at, grammar_idx)
+  select p_user_id, item->>'word', item->>'meaning', (item->>'misses')::int, 1, 1, p_now + interval '1 day', p_now, (item->>'grammar_idx')::smallint
+  from jsonb_array_elements(p_items) as item
+  where (item->>'misses')::int > 0
+  on conflict (user_id, word)
+  do update set wrong_count = wrong_words.wrong_count + excluded.wrong_count,
+                meaning = excluded.meaning,
+                box = 1, interval_days = 1,
+                due_at = excluded.due_at,
+                last_reviewed_at = excluded.last_reviewed_at,
+                grammar_idx = coalesce(excluded.grammar_idx, wrong_words.grammar_idx);
+$$;
+
+-- ------------------------------------------
+-- 대시보드 RPC (요약 행만 반환)
+-- ------------------------------------------
+-- 최근 p_days일의 날짜별 출석/완료 학생 수와 완료율
+create or replace function teacher_daily_completion(p_today date, p_days integer)
+returns table (day date, visitors integer, completers integer, completion_rate numeric)
+language sql stable
+as $$
+  select d.day, coalesce(r.visitors, 0), coalesce(r.completers, 0),
+         round(coalesce(r.completers, 0)::numeric / nullif(greatest(r.visitors, r.completers), 0), 3)
+  from generate_series(p_today - (p_days - 1), p_today, interval '1 day') as d(day)
+  left join daily_activity_rollup r on r.day = d.day::date
+  order by d.day;
+$$;
+
+-- 현재 연속 학습 일수 분포 (어제 이후로 오지 않은 학생은 0일)
+create or replace function teacher_streak_distribution(p_today date)
+returns table (bucket text, students bigint)
+language sql stable
+as $$
+  with s as (
+    select case when last_visit_date >= p_today - 1 then coalesce(streak, 0) else 0 end as streak from users
+  )
+  select b.bucket, count(s.streak)
+  from (values (0, '0일', 0, 0), (1, '1일', 1, 1), (2, '2-3일', 2, 3), (3, '4-6일', 4, 6), (4, '7-13일', 7, 13), (5, '14-29일', 14, 29), (6, '30일+', 30, 2147483647))
+       as b(ord, bucket, lo, hi)
+  left join s on s.streak between b.lo and b.hi
+  group by b.ord, b.bucket
+  order by b.ord;
+$$;
+
+-- 문법 단원별 많이 틀린 단어: (misses desc, word) 순서의 keyset 페이지네이션
+-- 첫 페이지는 p_after_misses = null, 다음 페이지는 이전 페이지 마지막 행의 (misses, word)를 넘김
+create or replace function teacher_missed_words(p_grammar_idx smallint, p_after_misses integer, p_after_word text, p_limit integer)
+returns table (word text, meaning text, misses integer, students integer)
+language sql stable
+as $$
+  select r.word, r.meaning, r.misses, r.students
+  from missed_word_rollup r
+  where r.grammar_idx = p_grammar_idx
+    and (p_after_misses is null or r.misses < p_after_misses or (r.misses = p_after_misses and r.word > p_after_word))
+  order by r.misses desc, r.word
+  limit p_limit;
+$$;
+
+-- 학생 목록: user_id 순서의 keyset 페이지네이션, 학생별 밀린 복습 수는 (user_id, due_at) 인덱스로 계산
+create or replace function teacher_students(p_today date, p_after_user_id text, p_limit integer)
+returns table (user_id text, current_level text, streak integer, total_complete_count integer, last_visit_date date, due_reviews bigint)
+language sql stable
+as $$
+  select u.user_id, u.current_level,
+         case when u.last_visit_date >= p_today - 1 then coalesce(u.streak, 0) else 0 end,
+         u.total_complete_count, u.last_visit_date,
+         (select count(*) from wrong_words w where w.user_id = u.user_id and w.due_at <= now())
+  from users u
+  where p_after_user_id is null or u.user_id > p_after_user_id
+  order by u.user_id
+  limit p_limit;
+$$;
@@ -0,0 +1,62 @@
+import json
+import os
+
+import pytest
+
+from content_pack import KIND_AUDIO, KIND_MISSION, ContentPack, ContentPacks, PackWriter, audio_key, blob_key, mission_key
+
+
+def write_pack(path, items, meta=None):
+    writer = PackWriter(str(path), meta or {"curriculum_version": 1})
+    for k, kind, data in items: writer.add(k, kind, data)
+    writer.close()
+    return ContentPack(str(path))
+
+
+def test_round_trip(tmp_path):
+    items = [(blob_key("audio", i), KIND_AUDIO, os.urandom(i * 7 + 1)) for i in range(200)]
+    items.append((mission_key("Mid", 3, 2), KIND_MISSION, json.dumps({"topic": "주제"}, ensure_ascii=False).encode("utf-8")))
+    pack = write_pack(tmp_path / "a.pack", items, {"curriculum_version": 1, "tts_model": "tts-1"})
+    for k, _, data in items: assert bytes(pack.get(k)) == data
+    assert pack.meta["tts_model"] == "tts-1" and pack.meta["entries"] == len(items)
+    assert sorted((k, kind, bytes(d)) for k, kind, d in pack.items()) == sorted(items)
+    assert not os.path.exists(f"{tmp_path / 'a.pack'}.{os.getpid()}.tmp")
+
+
+def test_missing_keys_around_every_entry(tmp_path):
+    # 정렬된 인덱스의 앞/뒤/사이에 있는 키도 이진 탐색이 None을 돌려줘야 함
+    keys = sorted(blob_key("k", i) for i in range(50))
+    pack = write_pack(tmp_path / "a.pack", [(k, KIND_AUDIO, k.encode()) for k in keys[1::2]])
+    for i, k in enumerate(keys):
+        assert (pack.get(k) is None) == (i % 2 == 0)
+    assert pack.get("0" * 64) is None and pack.get("f" * 64) is None
+
+
+def test_empty_pack(tmp_path):
+    pack = write_pack(tmp_path / "empty.pack", [])
+    assert pack.count == 0 and pack.get(audio_key("hello")) is None
+
+
+def test_identical_blobs_are_stored_once(tmp_path):
+    data = b"x" * 1000
+    pack = write_pack(tmp_path / "a.pack", [(mission_key(level, 0, 0), KIND_MISSION, data) for level in ("Low", "Mid", "High")])
+    assert pack.meta["entries"] == 3 and pack.meta["blobs"] == 1
+    assert os.path.getsize(tmp_path / "a.pack") < 2 * len(data)
+
+
+def test_newest_pack_wins_and_broken_packs_are_skipped(tmp_path):
+    k = audio_key("apple")
+    write_pack(tmp_path / "old.pack", [(k, KIND_AUDIO, b"old"), (audio_key("pear"), KIND_AUDIO, b"pear")])
+    os.utime(tmp_path / "old.pack", (1, 1))
+    write_pack(tmp_path / "new.pack", [(k, KIND_AUDIO, b"new")])
+    (tmp_path / "broken.pack").write_bytes(b"SPCK")
+    packs = ContentPacks(str(tmp_path))
+    assert len(packs) == 2
+    assert bytes(packs.get(k)) == b"new" and bytes(packs.get(audio_key("pear"))) == b"pear"
+    assert packs.get(audio_key("plum")) is None
+
+
+@pytest.mark.parametrize("data", [b"NOPE" + b"\0" * 28, b"SPCK\x02" + b"\0" * 27])
+def test_rejects_foreign_files(tmp_path, data):
+    path = tmp_path / "x.pack"; path.write_bytes(data)
+    with pytest.raises(ValueError): ContentPack(str(path))
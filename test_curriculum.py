@@ -0,0 +1,84 @@
+import json
+import random
+
+import pytest
+
+from curriculum import LEVELS, MissionStreamParser, is_valid_mission, normalize_level
+
+MISSION = {
+    "topic": "School Life (학교 {생활})",
+    "grammar": {"title": "Be동사", "description": "주어에 따라 \"am, are, is\"를 써요.", "rule": "S + be", "example": "I am a student."},
+    "words": [{"en": "desk", "ko": "책상"}, {"en": "a, b", "ko": "[괄호]"}, {"en": "back\\slash", "ko": "\\"}, {"en": "pen", "ko": "펜"}],
+    "practice_sentences": [{"ko": f"문장 {i}", "en": f"It is {{item {i}}}.", "hint_structure": "S + V", "hint_grammar": "팁, \"따옴표\""} for i in range(5)],
+    "count": 20,
+    "done": True,
+}
+
+
+def feed_in_chunks(chunks):
+    parser = MissionStreamParser(); out = []
+    for chunk in chunks: out.extend(parser.feed(chunk))
+    return out
+
+
+def expected_events(m):
+    events = []
+    for k, v in m.items():
+        if k == "practice_sentences": events.extend(("practice_sentences[]", q) for q in v)
+        events.append((k, v))
+    return events
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_whole_document(indent):
+    text = json.dumps(MISSION, ensure_ascii=False, indent=indent)
+    assert feed_in_chunks([text]) == expected_events(MISSION)
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_one_character_at_a_time(indent):
+    text = json.dumps(MISSION, ensure_ascii=False, indent=indent)
+    assert feed_in_chunks(text) == expected_events(MISSION)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_chunk_boundaries(seed):
+    rng = random.Random(seed)
+    text = json.dumps(MISSION, ensure_ascii=False, indent=rng.choice([None, 1]))
+    cuts = sorted(rng.sample(range(1, len(text)), 30))
+    chunks = [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+    assert feed_in_chunks(chunks) == expected_events(MISSION)
+
+
+def test_fields_are_emitted_as_soon_as_complete():
+    text = json.dumps(MISSION, ensure_ascii=False)
+    parser = MissionStreamParser()
+    cut = text.index('"practice_sentences"')
+    assert [k for k, _ in parser.feed(text[:cut])] == ["topic", "grammar", "words"]
+    first_item = json.dumps(MISSION["practice_sentences"][0], ensure_ascii=False)
+    first_item_end = text.index(first_item) + len(first_item)
+    assert parser.feed(text[cut:first_item_end]) == [("practice_sentences[]", MISSION["practice_sentences"][0])]
+
+
+def test_chunk_ending_in_escape():
+    text = json.dumps({"topic": 'a\\"b'}, ensure_ascii=False)
+    cut = text.index("\\") + 1
+    assert feed_in_chunks([text[:cut], text[cut:]]) == [("topic", 'a\\"b')]
+
+
+def test_streamed_mission_round_trips():
+    mission = {"practice_sentences": []}
+    for field, value in feed_in_chunks(json.dumps(MISSION, ensure_ascii=False)):
+        if field == "practice_sentences[]": mission["practice_sentences"].append(value)
+        elif field != "practice_sentences": mission[field] = value
+    assert mission == MISSION
+    assert is_valid_mission(mission)
+
+
+@pytest.mark.parametrize("text, level", [
+    ("Mid", "Mid"), ("The student's level is Mid.", "Mid"), ("high", "High"), ("**Low**", "Low"),
+    ("Low-Mid", "Low"), ("Middle", "Mid"), ("알 수 없음", "Mid"), (None, None),
+])
+def test_normalize_level(text, level):
+    assert normalize_level(text) == level
+    assert level is None or level in LEVELS
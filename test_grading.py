@@ -0,0 +1,43 @@
+import pytest
+
+from grading import grade_locally, normalize_sentence
+
+
+@pytest.mark.parametrize("text, tokens", [
+    ("I don't like it.", ["i", "do", "not", "like", "it"]),
+    ("She CAN'T swim!", ["she", "can", "not", "swim"]),
+    ("I’m fine, thanks.", ["i", "am", "fine", "thanks"]),
+    ("He's finished his homework.", ["he's", "finished", "his", "homework"]),
+    ("'Hello,'  said   Tom's dad.", ["hello", "said", "tom's", "dad"]),
+])
+def test_normalize_sentence(text, tokens):
+    assert normalize_sentence(text) == tokens
+
+
+@pytest.mark.parametrize("target, answer", [
+    ("I am a student.", "i am a student"),
+    ("I am a student.", "I'm a student!"),
+    ("They do not eat meat.", "They don't eat meat."),
+    ("He's tall.", "he's tall"),
+])
+def test_pass(target, answer):
+    assert grade_locally(target, answer) == "PASS"
+
+
+def test_single_token_feedback():
+    assert grade_locally("She likes apples.", "She like apples.") == "FAIL 'like' 대신 'likes'을(를) 써야 해요."
+    assert grade_locally("I go to school.", "I go school.") == "FAIL 'to'이(가) 빠졌어요."
+    assert grade_locally("I go to school.", "I go to the school.") == "FAIL 'the'은(는) 필요 없는 단어예요."
+
+
+@pytest.mark.parametrize("target, answer", [
+    # 's는 is/has 둘 다 될 수 있으므로 모델에게 맡김
+    ("He has finished his homework.", "He's finished his homework."),
+    ("He is a student.", "He's a student."),
+    ("It's raining.", "It is raining."),
+    # 두 군데 이상 다르거나 여러 단어가 바뀌면 모델에게 맡김
+    ("She likes apples.", "He like apples."),
+    ("I eat breakfast at seven.", "I have breakfast at 7 o'clock."),
+])
+def test_defers_to_model(target, answer):
+    assert grade_locally(target, answer) is None